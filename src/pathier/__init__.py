@@ -1,18 +1,52 @@
 import argparse
+import concurrent.futures
 
 import griddle
 import noiftimer
 import printbuddies
 import younotyou
 
+from .appender import Appender
+from .archive import ArchiveReport
+from .duplicates import DuplicateGroup, find_duplicates
+from .execution import ExecutionResult
+from .follower import Follower
+from .instrumentation import InstrumentStats, OpStats, instrument
+from .iohints import IOOptions
+from .locking import FileLock
 from .pathier import Pathier, Pathish, Pathy
+from .sizing import SizeReport
+from .sync import SyncReport
+from .walker import WalkFilter
+from .watcher import Change, Watcher
 
-__all__ = ["Pathier", "Pathy", "Pathish"]
+__all__ = [
+    "Pathier",
+    "Pathy",
+    "Pathish",
+    "instrument",
+    "InstrumentStats",
+    "OpStats",
+    "Watcher",
+    "Change",
+    "WalkFilter",
+    "DuplicateGroup",
+    "find_duplicates",
+    "SyncReport",
+    "ArchiveReport",
+    "Appender",
+    "FileLock",
+    "Follower",
+    "ExecutionResult",
+    "SizeReport",
+    "IOOptions",
+]
 
 
 @noiftimer.time_it()
 def sizeup():
-    """Print the sub-directories and their sizes of the current working directory."""
+    """Print the sub-directories and their sizes of the current working directory,
+    along with a breakdown by file extension and the largest files and directories."""
     parser = argparse.ArgumentParser("sizeup")
     parser.add_argument(
         "-i",
@@ -20,7 +54,27 @@ def sizeup():
         nargs="*",
         default=[],
         type=str,
-        help="Directory patterns to ignore.",
+        help="Directory patterns to ignore. Matching subdirectories and files are also skipped when sizing.",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=1,
+        help="The number of directories to scan concurrently.",
+    )
+    parser.add_argument(
+        "-k",
+        "--top",
+        type=int,
+        default=10,
+        help="The number of extensions, files, and directories to list.",
+    )
+    parser.add_argument(
+        "-o",
+        "--own",
+        action="store_true",
+        help="Rank directories by the files directly in them instead of their whole subtree.",
     )
     args = parser.parse_args()
     matcher = younotyou.Matcher(exclude_patterns=args.ignore)
@@ -31,18 +85,115 @@ def sizeup():
         if folder.is_dir() and str(folder) in matcher
     ]
     print(f"Sizing up {len(folders)} directories...")
-    for folder in printbuddies.track(folders, "Scanning directories"):
+    report = SizeReport(args.top, not args.own)
+
+    def scan(folder: Pathier) -> SizeReport | None:
         try:
-            sizes[folder.name] = folder.size
+            return folder.size_report(
+                exclude=args.ignore, top=args.top, cumulative=not args.own
+            )
         except Exception as e:
-            pass
+            return None
+
+    with concurrent.futures.ThreadPoolExecutor(args.workers) as pool:
+        for folder, folder_report in printbuddies.track(
+            zip(folders, pool.map(scan, folders)),
+            "Scanning directories",
+            total=len(folders),
+        ):
+            if folder_report:
+                sizes[folder.name] = folder_report.total
+                report.merge(folder_report)
     total_size = sum(sizes[folder] for folder in sizes)
     size_list = [
         (folder, Pathier.format_bytes(sizes[folder]))
         for folder in sorted(list(sizes.keys()), key=lambda f: sizes[f], reverse=True)
     ]
     print(griddle.griddy(size_list, ["Dir", "Size"]))
+    extensions = [
+        (extension, Pathier.format_bytes(size), count)
+        for extension, size, count in report.by_extension[: args.top]
+    ]
+    print(griddle.griddy(extensions, ["Extension", "Size", "Files"]))
+    for title, largest in [
+        ("Largest files", report.largest_files),
+        (
+            "Largest directories (own files only)"
+            if args.own
+            else "Largest directories",
+            report.largest_dirs,
+        ),
+    ]:
+        rows = [
+            (Pathier(path).relative_to(Pathier.cwd()), Pathier.format_bytes(size))
+            for path, size in largest
+        ]
+        print(griddle.griddy(rows, [title, "Size"]))
     print(f"Total size of '{Pathier.cwd()}': {Pathier.format_bytes(total_size)}")
 
 
+@noiftimer.time_it()
+def dupes():
+    """Print groups of duplicate files under the given directories (or the current working directory)."""
+    parser = argparse.ArgumentParser("dupes")
+    parser.add_argument(
+        "paths",
+        nargs="*",
+        default=[],
+        type=str,
+        help="Directories to search. Defaults to the current working directory.",
+    )
+    parser.add_argument(
+        "-i",
+        "--ignore",
+        nargs="*",
+        default=[],
+        type=str,
+        help="File and directory patterns to ignore.",
+    )
+    parser.add_argument(
+        "-m",
+        "--min_size",
+        type=int,
+        default=1,
+        help="Ignore files smaller than this many bytes.",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=None,
+        help="The number of threads to scan and hash with.",
+    )
+    parser.add_argument(
+        "-l",
+        "--link",
+        action="store_true",
+        help="Replace duplicates with hard links to the first file in their group.",
+    )
+    args = parser.parse_args()
+    paths = [Pathier(path) for path in args.paths] or [Pathier.cwd()]
+    print(f"Searching {len(paths)} directories for duplicates...")
+    groups = find_duplicates(
+        paths, WalkFilter(exclude=args.ignore), args.min_size, workers=args.workers
+    )
+    rows = [
+        (
+            Pathier.format_bytes(group.size),
+            Pathier.format_bytes(group.reclaimable),
+            "\n".join(group.paths),
+        )
+        for group in groups
+    ]
+    print(griddle.griddy(rows, ["Size", "Reclaimable", "Files"]))
+    reclaimable = sum(group.reclaimable for group in groups)
+    if args.link:
+        reclaimed = sum(group.hardlink() for group in groups)
+        print(f"Reclaimed {Pathier.format_bytes(reclaimed)} by hard linking duplicates.")
+    else:
+        print(
+            f"{len(groups)} groups of duplicates, {Pathier.format_bytes(reclaimable)} reclaimable."
+        )
+
+
 __version__ = "1.5.4"
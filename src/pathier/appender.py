@@ -0,0 +1,114 @@
+import atexit
+import locale
+import os
+import threading
+from typing import Any
+
+from typing_extensions import Self
+
+
+class Appender:
+    """A long lived, thread safe, buffered file appender.
+
+    Writes are buffered in memory and flushed whenever the buffer reaches `buffer_size` bytes
+    and every `flush_interval` seconds by a background thread.
+
+    The file is opened once with `O_APPEND` and each flush is a single `os.write` call,
+    so multiple processes can append to the same file without interleaving partial records.
+    Size triggered flushes only write up to the last complete line, keeping any partial line buffered.
+
+    Use as a context manager or call `close()` when done.
+    Any buffered data is also flushed at interpreter exit."""
+
+    def __init__(
+        self,
+        path: Any,
+        buffer_size: int = 64 * 1024,
+        flush_interval: float | None = 1.0,
+        encoding: str | None = None,
+        new_line: bool = True,
+    ):
+        self.path = path
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.encoding = encoding or locale.getpreferredencoding(False)
+        self.new_line = new_line
+        self.bytes_written = 0
+        self._buffer = bytearray()
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._fd = os.open(
+            path, os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o666
+        )
+        self._flusher: threading.Thread | None = None
+        if flush_interval is not None:
+            self._flusher = threading.Thread(target=self._flush_periodically, daemon=True)
+            self._flusher.start()
+        atexit.register(self.close)
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *args: Any):
+        self.close()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed.is_set()
+
+    def write(self, data: str | bytes) -> int:
+        """Buffer `data` to be appended.
+
+        `str` data is encoded with `self.encoding` and, if `self.new_line` is `True`, followed by a new line.
+
+        Returns the number of bytes buffered."""
+        if isinstance(data, str):
+            if self.new_line:
+                data += "\n"
+            data = data.encode(self.encoding)
+        with self._lock:
+            if self.closed:
+                raise ValueError("Write to closed appender.")
+            self._buffer += data
+            if len(self._buffer) >= self.buffer_size:
+                # Keep partial lines buffered so another process can't land in the middle of one
+                end = self._buffer.rfind(b"\n") + 1 or len(self._buffer)
+                self._write(end)
+        return len(data)
+
+    def _write(self, end: int):
+        """Write the first `end` buffered bytes. Must be called with `self._lock` held."""
+        view = memoryview(self._buffer)[:end]
+        written = 0
+        try:
+            while written < end:
+                written += os.write(self._fd, view[written:])
+        finally:
+            view.release()
+            del self._buffer[:written]
+            self.bytes_written += written
+
+    def flush(self):
+        """Write all buffered data to the file."""
+        with self._lock:
+            if self._buffer and not self.closed:
+                self._write(len(self._buffer))
+
+    def _flush_periodically(self):
+        while not self._closed.wait(self.flush_interval):
+            self.flush()
+
+    def close(self):
+        """Flush buffered data and close the file."""
+        with self._lock:
+            if self.closed:
+                return
+            try:
+                if self._buffer:
+                    self._write(len(self._buffer))
+            finally:
+                self._closed.set()
+                os.close(self._fd)
+        atexit.unregister(self.close)
+        if self._flusher and self._flusher is not threading.current_thread():
+            self._flusher.join()
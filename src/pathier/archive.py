@@ -0,0 +1,350 @@
+import collections
+import concurrent.futures
+import gzip
+import io
+import lzma
+import os
+import shutil
+import tarfile
+import time
+import zipfile
+from typing import Any
+
+from typing_extensions import IO, Buffer, Callable, Sequence
+
+from .walker import WalkFilter, walk
+
+BLOCK_SIZE = 4 * 1024 * 1024
+_CHUNK_SIZE = 1024 * 1024
+# Suffix -> (container, compression)
+_FORMATS = {
+    ".tar": ("tar", None),
+    ".tar.gz": ("tar", "gz"),
+    ".tgz": ("tar", "gz"),
+    ".tar.xz": ("tar", "xz"),
+    ".txz": ("tar", "xz"),
+    ".tar.zst": ("tar", "zst"),
+    ".tzst": ("tar", "zst"),
+    ".zip": ("zip", None),
+}
+
+
+class ArchiveReport:
+    """Statistics for a `pack()` or `unpack()` call."""
+
+    def __init__(self):
+        self.files = 0
+        self.bytes = 0
+        self.archive_bytes = 0
+        self.seconds = 0.0
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(files={self.files}, bytes={self.bytes}, "
+            f"archive_bytes={self.archive_bytes}, seconds={self.seconds})"
+        )
+
+    @property
+    def throughput(self) -> float:
+        """Uncompressed bytes per second."""
+        return self.bytes / self.seconds if self.seconds else 0.0
+
+
+def archive_format(path: Any) -> tuple[str, str | None]:
+    """Returns the container type and compression for the archive at `path` based on its suffixes."""
+    name = os.fspath(path).lower()
+    for suffix, archive_format in sorted(
+        _FORMATS.items(), key=lambda item: len(item[0]), reverse=True
+    ):
+        if name.endswith(suffix):
+            return archive_format
+    raise ValueError(f"No archive format exists for file type `{name}`.")
+
+
+def _zstandard() -> Any:
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ImportError(
+            "zstd compression requires the `zstandard` package: `pip install pathier[zstd]`"
+        ) from e
+    return zstandard
+
+
+class _BlockCompressor(io.RawIOBase):
+    """A write only stream that compresses fixed size blocks on a thread pool.
+
+    Each block is compressed independently by `compress` and written in order.
+    Concatenated gzip members and xz streams are valid files, so the output can be read by any gzip or xz reader."""
+
+    def __init__(
+        self,
+        raw: IO[bytes],
+        compress: Callable[[bytes], bytes],
+        block_size: int = BLOCK_SIZE,
+        workers: int | None = None,
+    ):
+        super().__init__()
+        self.raw = raw
+        self.compress = compress
+        self.block_size = block_size
+        workers = workers or os.cpu_count() or 1
+        self.pool = concurrent.futures.ThreadPoolExecutor(workers)
+        # Bound memory by only keeping a couple blocks per worker in flight
+        self.max_pending = workers * 2
+        self.pending: collections.deque[concurrent.futures.Future[bytes]] = (
+            collections.deque()
+        )
+        self.buffer = bytearray()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: Buffer) -> int:
+        data = memoryview(data)
+        self.buffer += data
+        while len(self.buffer) >= self.block_size:
+            self._submit(bytes(self.buffer[: self.block_size]))
+            del self.buffer[: self.block_size]
+        return data.nbytes
+
+    def _submit(self, block: bytes):
+        self.pending.append(self.pool.submit(self.compress, block))
+        while len(self.pending) > self.max_pending:
+            self.raw.write(self.pending.popleft().result())
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            if self.buffer:
+                self._submit(bytes(self.buffer))
+                self.buffer.clear()
+            while self.pending:
+                self.raw.write(self.pending.popleft().result())
+        finally:
+            self.pool.shutdown(cancel_futures=True)
+            super().close()
+
+
+class _CountingReader(io.RawIOBase):
+    """Wraps a readable binary stream and calls `on_read` with the number of bytes in each read."""
+
+    def __init__(self, raw: IO[bytes], on_read: Callable[[int], Any]):
+        super().__init__()
+        self.raw = raw
+        self.on_read = on_read
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.raw.read(size)
+        self.on_read(len(data))
+        return data
+
+    def readinto(self, buffer: Any) -> int:
+        data = self.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
+
+def _compressed_writer(
+    compression: str | None,
+    level: int | None,
+    block_size: int,
+    workers: int | None,
+) -> Callable[[IO[bytes]], IO[bytes]]:
+    """Returns a function that wraps a raw stream in a writer compressing with `compression`.
+
+    Resolved before the archive is opened, so a missing compressor doesn't leave an empty file behind."""
+    match compression:
+        case "gz":
+            level = 6 if level is None else level
+            return lambda raw: _BlockCompressor(  # type: ignore
+                raw,
+                lambda block: gzip.compress(block, level, mtime=0),  # type: ignore
+                block_size,
+                workers,
+            )
+        case "xz":
+            level = 6 if level is None else level
+            return lambda raw: _BlockCompressor(  # type: ignore
+                raw,
+                lambda block: lzma.compress(block, preset=level),
+                block_size,
+                workers,
+            )
+        case "zst":
+            compressor = _zstandard().ZstdCompressor(
+                level=3 if level is None else level, threads=workers or -1
+            )
+            return lambda raw: compressor.stream_writer(raw, closefd=False)
+        case _:
+            return lambda raw: raw
+
+
+def _decompressed_reader(raw: IO[bytes], compression: str | None) -> IO[bytes]:
+    match compression:
+        case "gz":
+            return gzip.GzipFile(fileobj=raw)  # type: ignore
+        case "xz":
+            return lzma.LZMAFile(raw)  # type: ignore
+        case "zst":
+            return _zstandard().ZstdDecompressor().stream_reader(
+                raw, read_across_frames=True, closefd=False
+            )
+        case _:
+            return raw
+
+
+def pack(
+    src: Any,
+    dst: Any,
+    include: Sequence[str] = (),
+    exclude: Sequence[str] = (),
+    level: int | None = None,
+    workers: int | None = None,
+    block_size: int = BLOCK_SIZE,
+    progress: Callable[[int, int], Any] | None = None,
+) -> ArchiveReport:
+    """Archive the file or directory `src` to `dst`.
+
+    See `Pathier.pack()` for details."""
+    start = time.perf_counter()
+    container, compression = archive_format(dst)
+    compressed_writer = _compressed_writer(compression, level, block_size, workers)
+    src, dst = os.path.abspath(src), os.fspath(dst)
+    base = os.path.dirname(src)
+    paths = [src]
+    if os.path.isdir(src):
+        walk_filter = WalkFilter(include, exclude, types=("file", "dir"))
+        # Don't archive the archive when it's written inside `src`
+        archive_path = os.path.abspath(dst)
+        paths.extend(
+            entry.path
+            for entry in walk(src, walk_filter)
+            if entry.path != archive_path
+        )
+    sizes = {path: os.path.getsize(path) for path in paths if os.path.isfile(path)}
+    total = sum(sizes.values())
+    report = ArchiveReport()
+
+    def on_read(count: int):
+        report.bytes += count
+        if progress:
+            progress(report.bytes, total)
+
+    os.makedirs(os.path.dirname(os.path.abspath(dst)), exist_ok=True)
+    with open(dst, "wb") as raw:
+        try:
+            if container == "zip":
+                level = 6 if level is None else level
+                with zipfile.ZipFile(
+                    raw, "w", zipfile.ZIP_DEFLATED, compresslevel=level
+                ) as archive:
+                    for path in paths:
+                        arcname = os.path.relpath(path, base)
+                        if path not in sizes:
+                            archive.write(path, arcname)
+                            continue
+                        info = zipfile.ZipInfo.from_file(path, arcname)
+                        info.compress_type = zipfile.ZIP_DEFLATED
+                        # `ZipFile.open()` ignores the archive's `compresslevel`, so it's set per member.
+                        # The attribute is public as `compress_level` from Python 3.13
+                        if hasattr(info, "compress_level"):
+                            info.compress_level = level  # type: ignore
+                        else:
+                            info._compresslevel = level  # type: ignore
+                        with open(path, "rb") as file, archive.open(
+                            info, "w", force_zip64=True
+                        ) as member:
+                            shutil.copyfileobj(
+                                _CountingReader(file, on_read), member, _CHUNK_SIZE  # type: ignore
+                            )
+                        report.files += 1
+            else:
+                stream = compressed_writer(raw)
+                try:
+                    with tarfile.open(
+                        fileobj=stream, mode="w|", bufsize=_CHUNK_SIZE
+                    ) as archive:
+                        for path in paths:
+                            info = archive.gettarinfo(path, os.path.relpath(path, base))
+                            if path in sizes:
+                                with open(path, "rb") as file:
+                                    archive.addfile(info, _CountingReader(file, on_read))  # type: ignore
+                                report.files += 1
+                            else:
+                                archive.addfile(info)
+                finally:
+                    if stream is not raw:
+                        stream.close()
+            report.archive_bytes = raw.tell()
+        except BaseException:
+            # Don't leave a partial archive behind
+            raw.close()
+            os.remove(dst)
+            raise
+    report.seconds = time.perf_counter() - start
+    return report
+
+
+def _safe_extract(archive: tarfile.TarFile, member: tarfile.TarInfo, dst: str):
+    if hasattr(tarfile, "data_filter"):
+        archive.extract(member, dst, filter="data")  # type: ignore
+        return
+    target = os.path.realpath(os.path.join(dst, member.name))
+    if os.path.commonpath([target, os.path.realpath(dst)]) != os.path.realpath(dst):
+        raise tarfile.TarError(f"{member.name} would be extracted outside of {dst}")
+    if member.issym() or member.islnk():
+        raise tarfile.TarError(f"Refusing to extract link {member.name}")
+    archive.extract(member, dst)
+
+
+def unpack(
+    src: Any,
+    dst: Any,
+    progress: Callable[[int, int], Any] | None = None,
+) -> ArchiveReport:
+    """Extract the archive `src` into the directory `dst`.
+
+    See `Pathier.unpack()` for details."""
+    start = time.perf_counter()
+    container, compression = archive_format(src)
+    src, dst = os.fspath(src), os.fspath(dst)
+    total = os.path.getsize(src)
+    report = ArchiveReport()
+
+    def on_read(count: int):
+        report.archive_bytes += count
+        if progress:
+            progress(report.archive_bytes, total)
+
+    os.makedirs(dst, exist_ok=True)
+    with open(src, "rb") as raw:
+        if container == "zip":
+            with zipfile.ZipFile(raw) as archive:
+                for info in archive.infolist():
+                    archive.extract(info, dst)
+                    on_read(info.compress_size)
+                    if not info.is_dir():
+                        report.files += 1
+                        report.bytes += info.file_size
+        else:
+            counted = io.BufferedReader(_CountingReader(raw, on_read), _CHUNK_SIZE)  # type: ignore
+            stream = _decompressed_reader(counted, compression)
+            try:
+                with tarfile.open(
+                    fileobj=stream, mode="r|", bufsize=_CHUNK_SIZE
+                ) as archive:
+                    for member in archive:
+                        _safe_extract(archive, member, dst)
+                        if member.isfile():
+                            report.files += 1
+                            report.bytes += member.size
+            finally:
+                if stream is not counted:
+                    stream.close()
+    report.seconds = time.perf_counter() - start
+    return report
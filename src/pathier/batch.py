@@ -0,0 +1,54 @@
+import concurrent.futures
+import os
+from typing import Any
+
+from typing_extensions import Callable, Sequence, TypeVar
+
+T = TypeVar("T")
+
+
+def make_parents(paths: Sequence[Any]) -> dict[str, OSError]:
+    """Create the parent directory of each of `paths`, once per unique directory.
+
+    Returns the directories that couldn't be created mapped to the error raised."""
+    errors: dict[str, OSError] = {}
+    for parent in sorted({os.path.dirname(os.path.abspath(path)) for path in paths}):
+        try:
+            os.makedirs(parent, exist_ok=True)
+        except OSError as e:
+            errors[parent] = e
+    return errors
+
+
+def run_many(
+    paths: Sequence[T],
+    job: Callable[[T], Any],
+    workers: int | None = None,
+    parents: bool = True,
+) -> dict[T, Exception]:
+    """Call `job` on each of `paths` in a thread pool.
+
+    If `parents` is `True`, every missing parent directory is created up front,
+    so the jobs never race each other to create the same directory.
+
+    Returns the paths whose job raised mapped to the exception, so one failure doesn't stop the rest of the batch.
+    Paths whose parent directory couldn't be created are reported with that error and not run."""
+    errors: dict[T, Exception] = {}
+    if parents:
+        failed = make_parents(paths)
+        if failed:
+            for path in paths:
+                parent = os.path.dirname(os.path.abspath(path))  # type: ignore
+                if parent in failed:
+                    errors[path] = failed[parent]
+    with concurrent.futures.ThreadPoolExecutor(workers) as pool:
+        futures = {
+            path: pool.submit(job, path) for path in paths if path not in errors
+        }
+        for path, future in futures.items():
+            error = future.exception()
+            if isinstance(error, Exception):
+                errors[path] = error
+            elif error:
+                raise error
+    return errors
@@ -0,0 +1,88 @@
+import concurrent.futures
+import mmap
+import os
+from typing import Any
+
+from typing_extensions import Callable, TypeVar
+
+T = TypeVar("T")
+
+
+def line_aligned_ranges(
+    path: Any, n: int | None = None, chunk_size: int | None = None
+) -> list[tuple[int, int]]:
+    """Split the file at `path` into `(start, end)` byte ranges that begin and end on line boundaries.
+
+    Boundaries are found by seeking to evenly spaced offsets and reading forward to the next new line,
+    so the file isn't read in full.
+    Ranges may be fewer than `n` if lines are long and are never empty, so an empty file has none."""
+    if n is not None and chunk_size is not None:
+        raise ValueError("Only one of `n` and `chunk_size` can be given.")
+    if (n is not None and n < 1) or (chunk_size is not None and chunk_size < 1):
+        raise ValueError("`n` and `chunk_size` must be positive.")
+    size = os.path.getsize(path)
+    if not size:
+        return []
+    if chunk_size is None:
+        n = n or os.cpu_count() or 1
+        chunk_size = -(-size // n)
+    boundaries = [0]
+    with open(path, "rb") as file:
+        for target in range(chunk_size, size, chunk_size):
+            if target <= boundaries[-1]:
+                # The previous line ran past this target
+                continue
+            # Start one byte early so a target that's already at a line start isn't pushed to the next line
+            file.seek(target - 1)
+            file.readline()
+            boundary = file.tell()
+            if boundary >= size:
+                break
+            boundaries.append(boundary)
+    boundaries.append(size)
+    return [
+        (start, end) for start, end in zip(boundaries, boundaries[1:]) if end > start
+    ]
+
+
+def read_range(
+    path: Any, start: int, end: int, func: Callable[[Any], T], use_mmap: bool = False
+) -> T:
+    """Call `func` with the bytes in `[start, end)` of the file at `path`.
+
+    If `use_mmap` is `True`, only that range is memory mapped and `func` receives a `memoryview` of it,
+    which is only valid for the duration of the call."""
+    if start >= end:
+        return func(b"")
+    with open(path, "rb") as file:
+        if not use_mmap:
+            file.seek(start)
+            return func(file.read(end - start))
+        aligned = start - start % mmap.ALLOCATIONGRANULARITY
+        with mmap.mmap(
+            file.fileno(), end - aligned, access=mmap.ACCESS_READ, offset=aligned
+        ) as mapped:
+            with memoryview(mapped) as view, view[start - aligned :] as data:
+                return func(data)
+
+
+def map_ranges(
+    path: Any,
+    func: Callable[[Any], T],
+    ranges: list[tuple[int, int]],
+    workers: int | None = None,
+    use_mmap: bool = False,
+) -> list[T]:
+    """Call `func` on each of `ranges` of the file at `path` in a process pool.
+
+    Only the path and offsets are sent to the workers, each of which reads or maps its own range.
+    `func` must be picklable, i.e. defined at the top level of a module.
+
+    Returns the results in the order of `ranges`."""
+    path = os.fspath(path)
+    with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+        futures = [
+            pool.submit(read_range, path, start, end, func, use_mmap)
+            for start, end in ranges
+        ]
+        return [future.result() for future in futures]
@@ -0,0 +1,156 @@
+import concurrent.futures
+import hashlib
+import os
+import uuid
+from typing import Any
+
+from typing_extensions import Callable, Iterable, Sequence
+
+from .iohints import IOOptions, iter_chunks
+from .walker import WalkFilter, walk
+
+# Bytes hashed from each end of a file during the partial hash stage
+PARTIAL_SIZE = 4096
+_CHUNK_SIZE = 1024 * 1024
+
+
+class DuplicateGroup:
+    """Files with identical content."""
+
+    def __init__(self, size: int, paths: list[Any]):
+        self.size = size
+        self.paths = paths
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(size={self.size}, paths={self.paths})"
+
+    @property
+    def reclaimable(self) -> int:
+        """The number of bytes that would be freed by keeping only one copy."""
+        return self.size * (len(self.paths) - 1)
+
+    def hardlink(self) -> int:
+        """Replace every file after the first in `self.paths` with a hard link to the first.
+
+        Each replacement is done by linking to a temporary name and renaming over the duplicate,
+        so a duplicate is never missing if linking fails.
+        Files that can't be linked, e.g. because they're on a different device, are left alone.
+
+        Returns the number of bytes reclaimed."""
+        keeper = os.fspath(self.paths[0])
+        reclaimed = 0
+        for duplicate in self.paths[1:]:
+            duplicate = os.fspath(duplicate)
+            temp = os.path.join(
+                os.path.dirname(duplicate), f".{uuid.uuid4().hex}.pathier-link"
+            )
+            try:
+                os.link(keeper, temp)
+                os.replace(temp, duplicate)
+            except OSError:
+                if os.path.lexists(temp):
+                    os.unlink(temp)
+                continue
+            reclaimed += self.size
+        return reclaimed
+
+
+def _partial_hash(path: str, size: int, partial_size: int) -> bytes | None:
+    """Hash the first and last `partial_size` bytes of `path`."""
+    try:
+        with open(path, "rb") as file:
+            digest = hashlib.blake2b(file.read(partial_size))
+            if size > partial_size:
+                file.seek(max(size - partial_size, partial_size))
+                digest.update(file.read(partial_size))
+    except OSError:
+        return None
+    return digest.digest()
+
+
+def hash_file(path: Any, io_options: IOOptions | None = None) -> bytes | None:
+    """Returns the blake2b digest of the file at `path` or `None` if it can't be read.
+
+    If `io_options` are given, the file is read with their buffer size and access pattern hints."""
+    try:
+        digest = hashlib.blake2b()
+        if io_options:
+            for chunk in iter_chunks(path, io_options):
+                digest.update(chunk)
+        else:
+            with open(path, "rb") as file:
+                while chunk := file.read(_CHUNK_SIZE):
+                    digest.update(chunk)
+    except OSError:
+        return None
+    return digest.digest()
+
+
+def _refine(
+    buckets: Iterable[list[str]],
+    hasher: Callable[[str], bytes | None],
+    pool: concurrent.futures.Executor,
+) -> list[list[str]]:
+    """Split each bucket by `hasher` and return the resulting buckets with more than one file."""
+    buckets = list(buckets)
+    paths = [path for bucket in buckets for path in bucket]
+    digests = dict(zip(paths, pool.map(hasher, paths)))
+    refined: list[list[str]] = []
+    for bucket in buckets:
+        by_digest: dict[bytes, list[str]] = {}
+        for path in bucket:
+            digest = digests[path]
+            if digest is not None:
+                by_digest.setdefault(digest, []).append(path)
+        refined.extend(group for group in by_digest.values() if len(group) > 1)
+    return refined
+
+
+def find_duplicates(
+    roots: Sequence[Any],
+    walk_filter: WalkFilter | None = None,
+    min_size: int = 1,
+    partial_size: int = PARTIAL_SIZE,
+    workers: int | None = None,
+    io_options: IOOptions | None = None,
+) -> list[DuplicateGroup]:
+    """Find files under `roots` with identical content.
+
+    Candidates are bucketed by size, then by a hash of their first and last `partial_size` bytes,
+    and only files still sharing a bucket are fully hashed.
+    Hashing is done on a thread pool of `workers` threads.
+    Hard links to the same file are only counted once.
+    `io_options` apply to the full hashes.
+
+    Returns groups sorted by reclaimable bytes, largest first."""
+    walk_filter = walk_filter or WalkFilter()
+    by_size: dict[int, list[str]] = {}
+    seen: set[tuple[int, int]] = set()
+    for root in roots:
+        for entry in walk(root, walk_filter, workers or 1):
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            if stat.st_size < min_size or (stat.st_dev, stat.st_ino) in seen:
+                continue
+            seen.add((stat.st_dev, stat.st_ino))
+            by_size.setdefault(stat.st_size, []).append(entry.path)
+    sizes = {
+        path: size for size, paths in by_size.items() if len(paths) > 1 for path in paths
+    }
+    with concurrent.futures.ThreadPoolExecutor(workers) as pool:
+        buckets = _refine(
+            (paths for paths in by_size.values() if len(paths) > 1),
+            lambda path: _partial_hash(path, sizes[path], partial_size),
+            pool,
+        )
+        # Files no larger than both ends were already hashed in full
+        done = [bucket for bucket in buckets if sizes[bucket[0]] <= 2 * partial_size]
+        buckets = _refine(
+            (bucket for bucket in buckets if sizes[bucket[0]] > 2 * partial_size),
+            lambda path: hash_file(path, io_options),
+            pool,
+        )
+    groups = [DuplicateGroup(sizes[bucket[0]], sorted(bucket)) for bucket in done + buckets]
+    return sorted(groups, key=lambda group: group.reclaimable, reverse=True)
@@ -0,0 +1,107 @@
+import concurrent.futures
+import os
+import shlex
+import subprocess
+import time
+from typing import Any
+
+from typing_extensions import Sequence
+
+
+class ExecutionResult:
+    """The outcome of running a command on one path."""
+
+    def __init__(self, path: Any, args: list[str]):
+        self.path = path
+        self.args = args
+        self.returncode: int | None = None
+        self.stdout: str | None = None
+        self.stderr: str | None = None
+        self.seconds = 0.0
+        self.timed_out = False
+        self.error: Exception | None = None
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(path={self.path!r}, returncode={self.returncode}, "
+            f"seconds={self.seconds}, timed_out={self.timed_out})"
+        )
+
+    @property
+    def ok(self) -> bool:
+        """Whether the command ran to completion and exited with `0`."""
+        return self.returncode == 0
+
+
+def build_args(command: str | Sequence[str], path: Any) -> list[str]:
+    """Returns the argument list for running `command` on `path`.
+
+    `command` tokens can contain `{path}`, `{name}`, `{stem}`, and `{parent}` placeholders.
+    If none do, the path is appended as the last argument.
+    String commands are split with `shlex.split` before substitution, so paths never need quoting."""
+    tokens = shlex.split(command) if isinstance(command, str) else list(command)
+    fields = {
+        "path": os.fspath(path),
+        "name": os.path.basename(path),
+        "stem": os.path.splitext(os.path.basename(path))[0],
+        "parent": os.path.dirname(os.fspath(path)),
+    }
+    placeholders = {f"{{{field}}}": value for field, value in fields.items()}
+    if not any(placeholder in token for token in tokens for placeholder in placeholders):
+        return tokens + [fields["path"]]
+    args: list[str] = []
+    # Plain replacement rather than `str.format` so other braces, e.g. in an awk script, are left alone
+    for token in tokens:
+        for placeholder, value in placeholders.items():
+            token = token.replace(placeholder, value)
+        args.append(token)
+    return args
+
+
+def _run(
+    path: Any,
+    args: list[str],
+    timeout: float | None,
+    capture_output: bool,
+    cwd: Any | None,
+) -> ExecutionResult:
+    result = ExecutionResult(path, args)
+    start = time.perf_counter()
+    try:
+        completed = subprocess.run(
+            args, capture_output=capture_output, text=True, timeout=timeout, cwd=cwd
+        )
+    except subprocess.TimeoutExpired as e:
+        result.timed_out = True
+        result.stdout = e.stdout.decode() if isinstance(e.stdout, bytes) else e.stdout
+        result.stderr = e.stderr.decode() if isinstance(e.stderr, bytes) else e.stderr
+    except OSError as e:
+        result.error = e
+    else:
+        result.returncode = completed.returncode
+        result.stdout = completed.stdout
+        result.stderr = completed.stderr
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+def execute_many(
+    paths: Sequence[Any],
+    command: str | Sequence[str],
+    workers: int | None = None,
+    timeout: float | None = None,
+    capture_output: bool = True,
+    cwd: Any | None = None,
+) -> list[ExecutionResult]:
+    """Run `command` on each of `paths` with at most `workers` processes at a time.
+
+    See `Pathier.execute_many()` for details."""
+    workers = workers or os.cpu_count() or 1
+    with concurrent.futures.ThreadPoolExecutor(workers) as pool:
+        futures = [
+            pool.submit(
+                _run, path, build_args(command, path), timeout, capture_output, cwd
+            )
+            for path in paths
+        ]
+        return [future.result() for future in futures]
@@ -0,0 +1,172 @@
+import asyncio
+import locale
+import math
+import os
+import time
+from typing import Any, AsyncIterator, Iterator
+
+from typing_extensions import IO, Self
+
+from .watcher import _WAKEUP_INTERVAL, _InotifyBackend, _load_libc
+
+_CHUNK_SIZE = 64 * 1024
+
+
+class Follower:
+    """Yields lines appended to a growing file, like `tail -F`.
+
+    The file is tracked by inode, so when it's rotated (renamed or deleted and recreated)
+    the rest of the old file is read before switching to the new one,
+    and when it's truncated reading restarts from the beginning.
+    Like `tail`, truncation is detected by the file becoming smaller than what's been read,
+    so a truncate followed by a larger write between two checks looks like an append.
+
+    `self.offset` and `self.inode` can be saved and passed back in to resume after a restart without rescanning.
+    Iterate over an instance with `for` or `async for`."""
+
+    def __init__(
+        self,
+        path: Any,
+        offset: int | None = None,
+        inode: int | None = None,
+        encoding: str | None = None,
+        errors: str | None = None,
+        keepends: bool = False,
+        poll_interval: float = 0.5,
+        timeout: float | None = None,
+        use_inotify: bool = True,
+    ):
+        self.path = path
+        self.encoding = encoding or locale.getpreferredencoding(False)
+        self.errors = errors or "strict"
+        self.keepends = keepends
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.offset = 0
+        self.inode: int | None = None
+        self._start_offset = offset
+        self._start_inode = inode
+        self._file: IO[bytes] | None = None
+        self._closed = False
+        libc = _load_libc() if use_inotify else None
+        self._backend: _InotifyBackend | None = None
+        if libc:
+            try:
+                self._backend = _InotifyBackend(
+                    libc, os.path.dirname(os.path.abspath(path)), False
+                )
+            except OSError:
+                # e.g. the file's directory doesn't exist yet or the watch limit was reached
+                pass
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *args: Any):
+        self.close()
+
+    def close(self):
+        """Stop following. Any iteration in progress will end."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._file:
+            self._file.close()
+        if self._backend:
+            self._backend.close()
+
+    def _open(self, offset: int | None) -> bool:
+        """Open `self.path` at `offset` or, if `None`, at the end.
+
+        Returns `False` if the file doesn't exist."""
+        try:
+            file = open(self.path, "rb")
+        except FileNotFoundError:
+            return False
+        stat = os.fstat(file.fileno())
+        if offset is None:
+            offset = stat.st_size
+        elif offset > stat.st_size:
+            # Truncated since the offset was saved
+            offset = 0
+        file.seek(offset)
+        if self._file:
+            self._file.close()
+        self._file, self.inode, self.offset = file, stat.st_ino, offset
+        return True
+
+    def _wait(self, seconds: float):
+        if self._backend:
+            self._backend.read(seconds)
+            return
+        # Sleep in slices so `close()` from another thread isn't held up by a long `poll_interval`
+        deadline = time.monotonic() + seconds
+        while not self._closed and (left := deadline - time.monotonic()) > 0:
+            time.sleep(min(left, _WAKEUP_INTERVAL))
+
+    def _decode(self, line: bytes) -> str:
+        if not self.keepends:
+            line = line.rstrip(b"\n").rstrip(b"\r")
+        return line.decode(self.encoding, self.errors)
+
+    def __iter__(self) -> Iterator[str]:
+        if self._start_offset is not None and self._start_inode is not None:
+            try:
+                if os.stat(self.path).st_ino != self._start_inode:
+                    # Rotated since the position was saved
+                    self._start_offset = 0
+            except FileNotFoundError:
+                pass
+        opened = self._open(self._start_offset)
+        buffer = b""
+        last_line = time.monotonic()
+        while not self._closed:
+            chunk = self._file.read(_CHUNK_SIZE) if opened else b""  # type: ignore
+            if chunk:
+                buffer += chunk
+                *lines, buffer = buffer.split(b"\n")
+                for line in lines:
+                    self.offset += len(line) + 1
+                    yield self._decode(line + b"\n")
+                if lines:
+                    last_line = time.monotonic()
+                continue
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                stat = None
+            if not opened:
+                if stat:
+                    # The file appeared after we started, so read all of it
+                    opened = self._open(0)
+                    continue
+            elif stat and stat.st_ino != self.inode:
+                # Rotated, and the old file has been read to the end
+                if buffer:
+                    self.offset += len(buffer)
+                    yield self._decode(buffer)
+                    buffer = b""
+                opened = self._open(0)
+                continue
+            elif stat and stat.st_size < self.offset + len(buffer):
+                buffer = b""
+                opened = self._open(0)
+                continue
+            if self.timeout is not None:
+                remaining = last_line + self.timeout - time.monotonic()
+                if remaining <= 0:
+                    return
+            else:
+                remaining = math.inf
+            self._wait(
+                min(remaining, _WAKEUP_INTERVAL if self._backend else self.poll_interval)
+            )
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        lines = iter(self)
+        done = object()
+        while True:
+            line = await asyncio.to_thread(next, lines, done)
+            if line is done:
+                return
+            yield line  # type: ignore
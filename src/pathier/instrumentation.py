@@ -0,0 +1,267 @@
+import contextlib
+import functools
+import os
+import threading
+import time
+from typing import Any, Iterator
+
+from typing_extensions import Callable, ParamSpec, Sequence, TypeVar
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+# Active `InstrumentStats` objects.
+# Instrumented methods check this before doing anything else so the disabled cost is a single truthiness test.
+_recorders: list["InstrumentStats"] = []
+_local = threading.local()
+
+
+class OpStats:
+    """Aggregated metrics for one operation under one path prefix.
+
+    All values are inclusive, i.e. the `bytes_read` and `syscalls` of `loads()`
+    include those of the `read_text()` and `open()` calls it makes."""
+
+    __slots__ = ("calls", "bytes_read", "bytes_written", "syscalls", "seconds")
+
+    def __init__(self):
+        self.calls = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.syscalls = 0
+        self.seconds = 0.0
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({', '.join(f'{k}={v}' for k, v in self.as_dict().items())})"
+
+    def add(self, other: "OpStats"):
+        """Add the metrics of `other` to this instance."""
+        self.calls += other.calls
+        self.bytes_read += other.bytes_read
+        self.bytes_written += other.bytes_written
+        self.syscalls += other.syscalls
+        self.seconds += other.seconds
+
+    def as_dict(self) -> dict[str, int | float]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class _Frame:
+    """Metrics for a single in-flight instrumented call."""
+
+    __slots__ = ("bytes_read", "bytes_written", "syscalls", "children")
+
+    def __init__(self):
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.syscalls = 0
+        # Frames of work done for this call on other threads, see `carry()`
+        self.children: list["_Frame"] = []
+
+    def add(self, other: "_Frame"):
+        self.bytes_read += other.bytes_read
+        self.bytes_written += other.bytes_written
+        self.syscalls += other.syscalls
+
+
+class InstrumentStats:
+    """Per path prefix, per operation metrics collected while an `instrument()` block is active."""
+
+    def __init__(self, prefixes: Sequence[Any] = ()):
+        # Longest first so the most specific prefix wins
+        self.prefixes = sorted(
+            (os.path.abspath(prefix) for prefix in prefixes), key=len, reverse=True
+        )
+        self.ops: dict[tuple[str, str], OpStats] = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.as_dict()})"
+
+    def prefix_for(self, path: Any) -> str:
+        """Returns the prefix `path` is aggregated under.
+
+        This is the longest of `self.prefixes` containing `path` or, if there isn't one, the parent of `path`."""
+        path = os.path.abspath(path)
+        for prefix in self.prefixes:
+            if path == prefix or path.startswith(prefix.rstrip(os.sep) + os.sep):
+                return prefix
+        return os.path.dirname(path)
+
+    def record(self, op: str, path: Any, frame: _Frame, seconds: float):
+        key = (self.prefix_for(path), op)
+        with self._lock:
+            stats = self.ops.get(key)
+            if stats is None:
+                stats = self.ops[key] = OpStats()
+            stats.calls += 1
+            stats.bytes_read += frame.bytes_read
+            stats.bytes_written += frame.bytes_written
+            stats.syscalls += frame.syscalls
+            stats.seconds += seconds
+
+    def by_op(self) -> dict[str, OpStats]:
+        """Returns metrics per operation summed across all prefixes."""
+        totals: dict[str, OpStats] = {}
+        for (_, op), stats in self.ops.items():
+            totals.setdefault(op, OpStats()).add(stats)
+        return totals
+
+    def by_prefix(self) -> dict[str, dict[str, OpStats]]:
+        """Returns metrics grouped by prefix, then by operation."""
+        grouped: dict[str, dict[str, OpStats]] = {}
+        for (prefix, op), stats in self.ops.items():
+            grouped.setdefault(prefix, {})[op] = stats
+        return grouped
+
+    def as_dict(self) -> dict[str, dict[str, dict[str, int | float]]]:
+        """Returns a json serializable version of `self.by_prefix()`."""
+        return {
+            prefix: {op: stats.as_dict() for op, stats in ops.items()}
+            for prefix, ops in self.by_prefix().items()
+        }
+
+
+def _stack() -> list[_Frame]:
+    try:
+        return _local.stack
+    except AttributeError:
+        _local.stack = []
+        return _local.stack
+
+
+def recording() -> bool:
+    """Whether any `instrument()` block is active."""
+    return bool(_recorders)
+
+
+def count(syscalls: int = 0, bytes_read: int = 0, bytes_written: int = 0):
+    """Add to the metrics of the innermost instrumented call in flight on this thread.
+
+    For work an instrumented method does directly rather than through other instrumented methods,
+    e.g. `os.scandir()` calls or bytes written through a file object.
+    Does nothing outside of an instrumented call."""
+    if not _recorders:
+        return
+    stack = _stack()
+    if stack:
+        frame = stack[-1]
+        frame.syscalls += syscalls
+        frame.bytes_read += bytes_read
+        frame.bytes_written += bytes_written
+
+
+def carry(func: Callable[P, R]) -> Callable[P, R]:
+    """Returns `func` wrapped so that anything counted while it runs on another thread,
+    e.g. in a thread pool, is added to the instrumented call in flight on this thread.
+
+    Work that finishes after that call returns isn't counted."""
+    if not _recorders:
+        return func
+    stack = _stack()
+    if not stack:
+        return func
+    parent = stack[-1]
+
+    @functools.wraps(func)
+    def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+        stack = _stack()
+        frame = _Frame()
+        stack.append(frame)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            stack.pop()
+            for child in frame.children:
+                frame.add(child)
+            # Appending is atomic, so the parent's counts are only touched by its own thread
+            parent.children.append(frame)
+
+    return wrapper
+
+
+def instrumented(
+    op: str,
+    syscall: bool = False,
+    read: Callable[[Any], int] | None = None,
+    written: Callable[[Any], int] | None = None,
+) -> Callable[[Callable[P, R]], Callable[P, R]]:
+    """Decorate a `Pathier` method so its calls are recorded while an `instrument()` block is active.
+
+    #### :params:
+
+    `op`: The operation name to record calls under.
+
+    `syscall`: Whether each call of this method counts as a filesystem call.
+
+    `read`: A function that takes the method's return value and returns the number of bytes read.
+
+    `written`: A function that takes the method's return value and returns the number of bytes written."""
+
+    def decorator(func: Callable[P, R]) -> Callable[P, R]:
+        @functools.wraps(func)
+        def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            if not _recorders:
+                return func(*args, **kwargs)
+            stack = _stack()
+            frame = _Frame()
+            stack.append(frame)
+            start = time.perf_counter()
+            failed = True
+            try:
+                result = func(*args, **kwargs)
+                failed = False
+            finally:
+                # Failed calls are still recorded, e.g. a `stat()` raising `FileNotFoundError` still cost a syscall
+                seconds = time.perf_counter() - start
+                stack.pop()
+                for child in frame.children:
+                    frame.add(child)
+                if syscall:
+                    frame.syscalls += 1
+                if not failed:
+                    if read:
+                        frame.bytes_read += read(result)
+                    if written:
+                        frame.bytes_written += written(result)
+                if stack:
+                    stack[-1].add(frame)
+                for recorder in tuple(_recorders):
+                    recorder.record(op, args[0], frame, seconds)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+@contextlib.contextmanager
+def instrument(
+    prefixes: Sequence[Any] = (),
+    sink: Callable[[InstrumentStats], Any] | None = None,
+) -> Iterator[InstrumentStats]:
+    """Record call counts, bytes read and written, filesystem call counts, and wall time
+    for `Pathier` operations performed inside this context.
+
+    Instrumentation is process wide and nestable; every active block records every operation.
+
+    #### :params:
+
+    `prefixes`: Paths to aggregate metrics under.
+    An operation is recorded under the longest prefix containing its path, or under the path's parent directory if none do.
+
+    `sink`: A function to pass the collected `InstrumentStats` to when the block exits,
+    e.g. to export them to a metrics system.
+
+    >>> with instrument(["data"]) as stats:
+    >>>     Pathier("data/config.json").loads()
+    >>> stats.by_op()["loads"].seconds - stats.by_op()["read_text"].seconds
+    >>> # Time spent parsing"""
+    stats = InstrumentStats(prefixes)
+    _recorders.append(stats)
+    try:
+        yield stats
+    finally:
+        _recorders.remove(stats)
+        if sink:
+            sink(stats)
@@ -0,0 +1,241 @@
+import errno
+import mmap
+import os
+import shutil
+from typing import Any, Iterator
+
+from typing_extensions import Buffer
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+DEFAULT_BUFFER_SIZE = 1024 * 1024
+# `O_DIRECT` needs buffers, offsets, and lengths aligned to the device's block size, which never exceeds a page
+_ALIGNMENT = mmap.PAGESIZE
+_O_DIRECT = getattr(os, "O_DIRECT", 0)
+_O_BINARY = getattr(os, "O_BINARY", 0)
+
+
+class IOOptions:
+    """Buffer size and kernel access pattern hints for large reads, writes, copies, and hashes.
+
+    Hints are given with `os.posix_fadvise` and skipped on platforms without it.
+
+    #### :params:
+
+    `buffer_size`: The number of bytes per read and write call.
+    Rounded up to a multiple of the page size when `direct` is `True`.
+
+    `sequential`: Tell the kernel files will be read front to back, so it reads further ahead.
+
+    `willneed`: Have the kernel start loading the whole file into the page cache in the background when it's opened.
+
+    `dontneed`: Drop file pages from the page cache once they've been read or written,
+    so a large one off scan or copy doesn't evict the cache other processes depend on.
+    Written pages can only be dropped once they're on disk, so written files are `fdatasync`ed before they're closed.
+
+    `direct`: Write with `O_DIRECT` to bypass the page cache entirely.
+    Where `O_DIRECT` isn't supported, e.g. on tmpfs or outside of Linux, writes fall back to `dontneed` behaviour.
+
+    >>> hints = IOOptions(buffer_size=8 * 1024 * 1024, sequential=True, dontneed=True)
+    >>> Pathier("huge.bin").copy("backups/huge.bin", io_options=hints)"""
+
+    def __init__(
+        self,
+        buffer_size: int | None = None,
+        sequential: bool = False,
+        willneed: bool = False,
+        dontneed: bool = False,
+        direct: bool = False,
+    ):
+        if buffer_size is not None and buffer_size < 1:
+            raise ValueError("`buffer_size` must be positive.")
+        self.buffer_size = buffer_size
+        self.sequential = sequential
+        self.willneed = willneed
+        self.dontneed = dontneed
+        self.direct = direct
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(buffer_size={self.buffer_size}, sequential={self.sequential}, "
+            f"willneed={self.willneed}, dontneed={self.dontneed}, direct={self.direct})"
+        )
+
+    @property
+    def chunk_size(self) -> int:
+        """The number of bytes per read and write call."""
+        size = self.buffer_size or DEFAULT_BUFFER_SIZE
+        if self.direct:
+            size += -size % _ALIGNMENT
+        return size
+
+    def _advise(self, fd: int, advice: str, offset: int = 0, length: int = 0):
+        if hasattr(os, "posix_fadvise"):
+            try:
+                os.posix_fadvise(fd, offset, length, getattr(os, advice))
+            except OSError:
+                # Hints are best effort, e.g. pipes don't accept them
+                pass
+
+    def opened(self, fd: int):
+        """Give the access pattern hints for a newly opened `fd`."""
+        if self.sequential:
+            self._advise(fd, "POSIX_FADV_SEQUENTIAL")
+        if self.willneed:
+            self._advise(fd, "POSIX_FADV_WILLNEED")
+
+    def consumed(self, fd: int, offset: int, length: int):
+        """Drop `length` bytes from `offset` of `fd` from the page cache if `self.dontneed` is `True`.
+
+        Dirty pages aren't dropped, so for writes this only frees what's already been written back."""
+        if self.dontneed:
+            self._advise(fd, "POSIX_FADV_DONTNEED", offset, length)
+
+
+def _open_write(path: Any, options: IOOptions) -> tuple[int, bool]:
+    """Open `path` for writing, with `O_DIRECT` if requested and supported.
+
+    Returns the file descriptor and whether `O_DIRECT` is in use."""
+    flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | _O_BINARY
+    if options.direct and _O_DIRECT:
+        try:
+            return os.open(path, flags | _O_DIRECT, 0o666), True
+        except OSError as e:
+            if e.errno != errno.EINVAL:
+                raise
+    return os.open(path, flags, 0o666), False
+
+
+class _Writer:
+    """Writes to `fd` in `options.chunk_size` blocks.
+
+    With `O_DIRECT`, data is staged in a page aligned buffer and only whole blocks are written directly.
+    The unaligned tail is written after clearing `O_DIRECT`."""
+
+    def __init__(self, fd: int, options: IOOptions, direct: bool):
+        self.fd = fd
+        self.options = options
+        self.direct = direct
+        self.offset = 0
+        self._buffer = mmap.mmap(-1, options.chunk_size) if direct else None
+        self._view = memoryview(self._buffer) if self._buffer else None
+        self._filled = 0
+
+    def _disable_direct(self):
+        if self.direct and fcntl:
+            flags = fcntl.fcntl(self.fd, fcntl.F_GETFL)
+            fcntl.fcntl(self.fd, fcntl.F_SETFL, flags & ~_O_DIRECT)
+        self.direct = False
+
+    def _write_all(self, data: memoryview):
+        if not data:
+            return
+        start = self.offset
+        while data:
+            try:
+                written = os.write(self.fd, data)
+            except OSError as e:
+                # Some file systems accept `O_DIRECT` at open and only reject it on write
+                if not (self.direct and e.errno == errno.EINVAL):
+                    raise
+                self._disable_direct()
+                continue
+            data = data[written:]
+            self.offset += written
+        if not self.direct:
+            self.options.consumed(self.fd, start, self.offset - start)
+
+    def write(self, data: Buffer):
+        with memoryview(data) as view, view.cast("B") as data:
+            if not self._view:
+                chunk_size = self.options.chunk_size
+                for start in range(0, len(data), chunk_size):
+                    self._write_all(data[start : start + chunk_size])
+                return
+            while data:
+                size = min(len(data), len(self._view) - self._filled)
+                self._view[self._filled : self._filled + size] = data[:size]
+                self._filled += size
+                data = data[size:]
+                if self._filled == len(self._view):
+                    self._write_all(self._view)
+                    self._filled = 0
+
+    def close(self):
+        """Write anything still buffered and, when avoiding the cache, sync and drop the file's pages."""
+        try:
+            if self._view:
+                aligned = self._filled - self._filled % _ALIGNMENT
+                self._write_all(self._view[:aligned])
+                self._disable_direct()
+                self._write_all(self._view[aligned : self._filled])
+            if self.options.dontneed or self.options.direct:
+                if hasattr(os, "fdatasync"):
+                    os.fdatasync(self.fd)
+                else:
+                    os.fsync(self.fd)
+                self.options._advise(self.fd, "POSIX_FADV_DONTNEED")
+        finally:
+            if self._view:
+                self._view.release()
+                self._buffer.close()  # type: ignore
+            os.close(self.fd)
+
+
+def iter_chunks(path: Any, options: IOOptions) -> Iterator[bytes]:
+    """Yield the contents of the file at `path` in `options.chunk_size` pieces, applying `options`' hints."""
+    fd = os.open(path, os.O_RDONLY | _O_BINARY)
+    try:
+        options.opened(fd)
+        offset = 0
+        while chunk := os.read(fd, options.chunk_size):
+            yield chunk
+            options.consumed(fd, offset, len(chunk))
+            offset += len(chunk)
+    finally:
+        options.consumed(fd, 0, 0)
+        os.close(fd)
+
+
+def read_file(path: Any, options: IOOptions) -> bytes:
+    """Returns the contents of the file at `path`, read with `options`."""
+    return b"".join(iter_chunks(path, options))
+
+
+def write_file(path: Any, data: Buffer, options: IOOptions) -> int:
+    """Write `data` to the file at `path` with `options` and return the number of bytes written."""
+    fd, direct = _open_write(path, options)
+    writer = _Writer(fd, options, direct)
+    try:
+        writer.write(data)
+    finally:
+        writer.close()
+    return writer.offset
+
+
+def copy_file(src: Any, dst: Any, options: IOOptions) -> Any:
+    """Copy the contents of `src` to `dst` with `options`, like `shutil.copyfile`.
+
+    Returns `dst`."""
+    if os.path.exists(dst) and os.path.samefile(src, dst):
+        # Opening `dst` for writing would truncate `src`
+        raise shutil.SameFileError(f"{src!r} and {dst!r} are the same file")
+    chunks = iter_chunks(src, options)
+    # Open `src` before creating `dst` so a missing source doesn't leave an empty copy behind
+    first = next(chunks, b"")
+    try:
+        fd, direct = _open_write(dst, options)
+    except BaseException:
+        chunks.close()
+        raise
+    writer = _Writer(fd, options, direct)
+    try:
+        writer.write(first)
+        for chunk in chunks:
+            writer.write(chunk)
+    finally:
+        writer.close()
+    return dst
@@ -0,0 +1,94 @@
+import os
+import time
+from typing import Any
+
+from typing_extensions import Self
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+    """An advisory, cross-process lock backed by `fcntl.flock` on the file at `path`.
+
+    Shared locks can be held by any number of processes at once, exclusive locks by only one.
+    On Windows, `msvcrt.locking` is used and every lock is exclusive.
+
+    Locks conflict between separate `FileLock` instances even within the same process,
+    so one instance shouldn't be shared between threads."""
+
+    def __init__(
+        self,
+        path: Any,
+        shared: bool = False,
+        timeout: float | None = None,
+        poll_interval: float = 0.01,
+    ):
+        self.path = path
+        self.shared = shared
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self._fd: int | None = None
+
+    def __enter__(self) -> Self:
+        self.acquire()
+        return self
+
+    def __exit__(self, *args: Any):
+        self.release()
+
+    @property
+    def locked(self) -> bool:
+        """Whether this instance currently holds the lock."""
+        return self._fd is not None
+
+    def _try_lock(self, fd: int, blocking: bool) -> bool:
+        try:
+            if fcntl:
+                flags = fcntl.LOCK_SH if self.shared else fcntl.LOCK_EX
+                fcntl.flock(fd, flags if blocking else flags | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)  # type: ignore
+        except (BlockingIOError, PermissionError):
+            return False
+        return True
+
+    def acquire(self):
+        """Block until the lock is acquired.
+
+        Raises `TimeoutError` if `self.timeout` seconds pass first."""
+        if self.locked:
+            raise RuntimeError(f"{self.path} is already locked by this instance.")
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o666)
+        try:
+            if self.timeout is None:
+                self._try_lock(fd, True)
+            else:
+                deadline = time.monotonic() + self.timeout
+                while not self._try_lock(fd, False):
+                    if time.monotonic() >= deadline:
+                        raise TimeoutError(
+                            f"Could not lock {self.path} within {self.timeout} seconds."
+                        )
+                    time.sleep(self.poll_interval)
+        except BaseException:
+            os.close(fd)
+            raise
+        self._fd = fd
+
+    def release(self):
+        """Release the lock if it's held."""
+        if self._fd is None:
+            return
+        try:
+            if fcntl:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            else:
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)  # type: ignore
+        finally:
+            os.close(self._fd)
+            self._fd = None
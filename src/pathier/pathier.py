@@ -1,5 +1,7 @@
+import contextlib
 import datetime
 import functools
+import hashlib
 import json
 import os
 import pathlib
@@ -7,10 +9,44 @@ import pickle
 import shutil
 import sys
 import time
-from typing import Any
+import uuid
+from typing import Any, Iterator
 
 import tomlkit
-from typing_extensions import IO, Buffer, Callable, Self, Sequence
+from typing_extensions import IO, Buffer, Callable, Mapping, Self, Sequence, TypeVar
+
+from . import archive, batch, chunking, iohints
+from .appender import Appender
+from .archive import ArchiveReport
+from .duplicates import DuplicateGroup, find_duplicates
+from .execution import ExecutionResult, execute_many
+from .follower import Follower
+from .instrumentation import count, instrumented, recording
+from .iohints import IOOptions
+from .locking import FileLock
+from .sizing import SizeReport, size_report
+from .sync import SyncReport, sync
+from .walker import WalkFilter, walk
+from .watcher import Watcher
+
+T = TypeVar("T")
+
+
+@contextlib.contextmanager
+def _toml_encoders(toml_encoders: Sequence[Callable[[Any], Any]]) -> Iterator[None]:
+    """Register `toml_encoders` with `tomlkit` for the duration of the context."""
+    encoders: list[Callable[[Any], Any]] = []
+    for toml_encoder in toml_encoders:
+        encoder: Callable[[Any], Any] = lambda x, encode=toml_encoder: tomlkit.item(  # type: ignore
+            encode(x)
+        )
+        encoders.append(encoder)
+        tomlkit.register_encoder(encoder)
+    try:
+        yield
+    finally:
+        for encoder in encoders:
+            tomlkit.unregister_encoder(encoder)
 
 
 class Pathier(pathlib.Path):
@@ -55,6 +91,11 @@ class Pathier(pathlib.Path):
         return path
 
     # ===============================================stats===============================================
+    @instrumented("stat", syscall=True)
+    def stat(self, *, follow_symlinks: bool = True) -> os.stat_result:
+        """Return the result of the stat() system call on this path, like os.stat() does."""
+        return super().stat(follow_symlinks=follow_symlinks)
+
     @property
     def dob(self) -> datetime.datetime | None:
         """Returns the creation date of this file or directory as a `dateime.datetime` object."""
@@ -114,6 +155,7 @@ class Pathier(pathlib.Path):
         #### Caveat:
         May not be accurate if the file was modified within a couple of seconds of checking this property.
         (For instance, on my machine `self.mod_date` is consistently 1-1.5s in the future from when `self.write_text()` was called according to `time.time()`.)
+        To be notified of changes instead of polling this property, use `self.watch()` or `self.watch_loads()`.
         """
         return (
             False
@@ -124,18 +166,80 @@ class Pathier(pathlib.Path):
         )
 
     @property
+    @instrumented("size")
     def size(self) -> int:
         """Returns the size in bytes of this file or directory.
 
         If this path doesn't exist, `0` will be returned."""
+        return self.get_size()
+
+    @instrumented("get_size")
+    def get_size(
+        self,
+        include: Sequence[str] = (),
+        exclude: Sequence[str] = (),
+        workers: int = 1,
+    ) -> int:
+        """Returns the size in bytes of this file or directory.
+
+        If this path doesn't exist, `0` will be returned.
+
+        #### :params:
+
+        `include`: If given, only count files matching at least one of these patterns.
+
+        `exclude`: Don't count files or descend into directories matching any of these patterns.
+
+        `workers`: The number of threads to scan directories with.
+
+        See `self.walk_entries()` for pattern matching details.
+
+        >>> Pathier("project").get_size(exclude=[".git", "node_modules"])"""
         if not self.exists():
             return 0
         elif self.is_file():
             return self.stat().st_size
         elif self.is_dir():
-            return sum(file.stat().st_size for file in self.rglob("*.*"))
+            size = files = 0
+            for entry in walk(self, WalkFilter(include, exclude), workers):
+                size += entry.stat().st_size
+                files += 1
+            count(syscalls=files)
+            return size
         return 0
 
+    @instrumented("size_report")
+    def size_report(
+        self,
+        include: Sequence[str] = (),
+        exclude: Sequence[str] = (),
+        top: int = 10,
+        cumulative: bool = True,
+    ) -> SizeReport:
+        """Scan this directory once and return a `SizeReport` with the `total` size and number of `files`,
+        a `by_extension` breakdown, and the `top` `largest_files` and `largest_dirs`.
+
+        The largest files and directories are tracked with bounded heaps,
+        so memory use depends on `top` and the tree depth rather than the number of files.
+
+        #### :params:
+
+        `include`: If given, only count files matching at least one of these patterns.
+
+        `exclude`: Don't count files or descend into directories matching any of these patterns.
+
+        `top`: How many of the largest files and directories to keep.
+
+        `cumulative`: If `True`, directory sizes include all of their subdirectories, like `du`.
+        If `False`, they only count the files directly in them.
+
+        See `self.walk_entries()` for pattern matching details.
+
+        >>> report = Pathier.home().size_report(exclude=[".cache"], top=5)
+        >>> report.largest_files
+        >>> [('/home/me/videos/big.mkv', 4521300012), ...]"""
+        return size_report(self, include, exclude, top, cumulative)
+
     @property
     def formatted_size(self) -> str:
         """The size of this file or directory formatted with `self.format_bytes()`."""
@@ -267,7 +371,154 @@ class Pathier(pathlib.Path):
             return self.__class__(*self.parts[self.parts.index(name) :])
         return self.__class__(*self.parts[self.parts.index(name) + 1 :])
 
+    # ============================================tree walking============================================
+    def walk_entries(
+        self,
+        include: Sequence[str] = (),
+        exclude: Sequence[str] = (),
+        min_size: int | None = None,
+        max_size: int | None = None,
+        newer_than: float | None = None,
+        older_than: float | None = None,
+        types: Sequence[str] = ("file",),
+        predicate: Callable[[os.DirEntry[str]], bool] | None = None,
+        follow_symlinks: bool = False,
+        workers: int = 1,
+    ) -> Iterator[os.DirEntry[str]]:
+        """Recursively yield `os.DirEntry` objects for this directory's contents using `os.scandir`.
+
+        Filters are evaluated from the entries' cached type and stat data
+        and excluded directories are pruned before they're scanned.
+        Unreadable subdirectories are skipped.
+
+        Patterns are `fnmatch` style and are matched against both an entry's name
+        and its path relative to this directory (using forward slashes).
+
+        #### :params:
+
+        `include`: If given, only yield entries matching at least one of these patterns.
+        Doesn't affect which directories are descended into.
+
+        `exclude`: Don't yield or descend into entries matching any of these patterns.
+
+        `min_size`: Only yield entries at least this many bytes.
+
+        `max_size`: Only yield entries at most this many bytes.
+
+        `newer_than`: Only yield entries modified less than this many seconds ago.
+
+        `older_than`: Only yield entries modified more than this many seconds ago.
+
+        `types`: The kinds of entries to yield, any of `"file"` and `"dir"`.
+
+        `predicate`: An additional function that takes an `os.DirEntry` and returns whether to yield it.
+
+        `follow_symlinks`: Whether to descend into symlinked directories.
+
+        `workers`: If greater than `1`, scan directories concurrently with this many threads.
+        Entries will then be yielded in no particular order.
+
+        >>> path = Pathier("project")
+        >>> for entry in path.walk_entries(["*.py"], [".git", "node_modules", "__pycache__"]):
+        >>>     print(entry.path, entry.stat().st_size)"""
+        yield from walk(
+            self,
+            WalkFilter(
+                include,
+                exclude,
+                min_size,
+                max_size,
+                newer_than,
+                older_than,
+                types,
+                predicate,
+                follow_symlinks,
+            ),
+            workers,
+        )
+
+    def walk_files(
+        self,
+        include: Sequence[str] = (),
+        exclude: Sequence[str] = (),
+        min_size: int | None = None,
+        max_size: int | None = None,
+        newer_than: float | None = None,
+        older_than: float | None = None,
+        types: Sequence[str] = ("file",),
+        predicate: Callable[[os.DirEntry[str]], bool] | None = None,
+        follow_symlinks: bool = False,
+        workers: int = 1,
+    ) -> Iterator[Self]:
+        """Same as `self.walk_entries()`, but yields `Pathier` objects.
+
+        >>> path = Pathier("project")
+        >>> big_logs = list(path.walk_files(["*.log"], min_size=10_000_000))"""
+        for entry in self.walk_entries(
+            include,
+            exclude,
+            min_size,
+            max_size,
+            newer_than,
+            older_than,
+            types,
+            predicate,
+            follow_symlinks,
+            workers,
+        ):
+            yield self.__class__(entry.path)
+
+    def find_duplicates(
+        self,
+        include: Sequence[str] = (),
+        exclude: Sequence[str] = (),
+        min_size: int = 1,
+        workers: int | None = None,
+        hardlink: bool = False,
+        io_options: IOOptions | None = None,
+    ) -> list[DuplicateGroup]:
+        """Find files under this directory with identical content.
+
+        Files are bucketed by size, then by a hash of their first and last few kilobytes,
+        and only files that are still candidates get fully hashed.
+        Hashing is done in parallel.
+
+        Returns a list of `DuplicateGroup`s, each with the shared file `size`, the duplicate `paths`,
+        and the number of `reclaimable` bytes, sorted by `reclaimable` in descending order.
+
+        #### :params:
+
+        `include`: If given, only consider files matching at least one of these patterns.
+
+        `exclude`: Don't consider files or descend into directories matching any of these patterns.
+
+        `min_size`: Ignore files smaller than this many bytes.
+
+        `workers`: The number of threads to scan and hash with.
+        Defaults to the `concurrent.futures.ThreadPoolExecutor` default.
+
+        `hardlink`: If `True`, replace every file in a group after the first with a hard link to the first.
+
+        `io_options`: Buffer size and page cache hints for reading files to hash.
+        e.g. `IOOptions(sequential=True, dontneed=True)` keeps a large scan from evicting other processes' cached files.
+
+        >>> groups = Pathier("photos").find_duplicates(exclude=[".thumbnails"])
+        >>> sum(group.reclaimable for group in groups)"""
+        groups = find_duplicates(
+            [self],
+            WalkFilter(include, exclude),
+            min_size,
+            workers=workers,
+            io_options=io_options,
+        )
+        for group in groups:
+            group.paths = [self.__class__(path) for path in group.paths]
+            if hardlink:
+                group.hardlink()
+        return groups
+
     # ============================================write and read============================================
+    @instrumented("mkdir", syscall=True)
     def mkdir(self, mode: int = 511, parents: bool = True, exist_ok: bool = True):
         """Create this directory.
 
@@ -275,11 +526,13 @@ class Pathier(pathlib.Path):
         """
         super().mkdir(mode, parents, exist_ok)
 
+    @instrumented("touch", syscall=True)
     def touch(self, mode: int = 438, exist_ok: bool = True):
         """Create file (and parents if necessary)."""
         self.parent.mkdir()
         super().touch(mode, exist_ok)
 
+    @instrumented("open", syscall=True)
     def open(  # type: ignore
         self,
         mode: str = "r",
@@ -287,16 +540,65 @@ class Pathier(pathlib.Path):
         encoding: str | None = None,
         errors: str | None = None,
         newline: str | None = None,
+        io_options: IOOptions | None = None,
     ) -> IO[Any]:
         """
         Open the file pointed by this path and return a file object, as
         the built-in open() function does.
+
+        If `io_options` are given, their `buffer_size` is used when `buffering` isn't
+        and their `sequential` and `willneed` hints are applied.
+        `dontneed` and `direct` are only honored by whole file operations like `read_bytes()`, `write_bytes()`, and `copy()`.
         """
+        if io_options and io_options.buffer_size and buffering == -1:
+            buffering = io_options.buffer_size
         stream = super().open(mode, buffering, encoding, errors, newline)
+        if io_options:
+            io_options.opened(stream.fileno())
         if "r" in mode:
             self._last_read_time = time.time()
         return stream
 
+    @instrumented("read_text")
+    def read_text(self, encoding: Any | None = None, errors: Any | None = None) -> str:
+        """Open the file in text mode, read it, and close the file."""
+        with self.open(encoding=encoding, errors=errors) as file:
+            text = file.read()
+            if recording():
+                # Encoded bytes, not decoded characters
+                count(bytes_read=file.buffer.tell())  # type: ignore
+        return text
+
+    @instrumented("read_bytes", read=len)
+    def read_bytes(self, io_options: IOOptions | None = None) -> bytes:
+        """Open the file in bytes mode, read it, and close the file.
+
+        If `io_options` are given, the file is read with their buffer size and page cache hints."""
+        if io_options:
+            return iohints.read_file(self, io_options)
+        return super().read_bytes()
+
+    def _write_str(
+        self,
+        data: str,
+        mode: str,
+        encoding: Any | None = None,
+        errors: Any | None = None,
+        newline: Any | None = None,
+    ) -> int:
+        """Write `data` to this file opened in text `mode` and return the number of characters written.
+
+        While instrumenting, the number of encoded bytes written is counted."""
+        with self.open(mode, encoding=encoding, errors=errors, newline=newline) as file:
+            if not recording():
+                return file.write(data)
+            start = file.buffer.tell()  # type: ignore
+            written = file.write(data)
+            file.flush()
+            count(bytes_written=file.buffer.tell() - start)  # type: ignore
+            return written
+
+    @instrumented("write_text")
     def write_text(
         self,
         data: Any,
@@ -307,21 +609,21 @@ class Pathier(pathlib.Path):
     ) -> int:
         """Write data to file.
 
-        If a `TypeError` is raised, the function  will attempt to cast `data` to a `str` and try the write again.
+        If `data` isn't a `str`, it will be cast to one before writing.
 
         If a `FileNotFoundError` is raised and `parents = True`, `self.parent` will be created.
         """
+        if not isinstance(data, str):
+            data = str(data)
         write = functools.partial(
-            super().write_text,
+            self._write_str,
+            mode="w",
             encoding=encoding,
             errors=errors,
             newline=newline,
         )
         try:
             return write(data)
-        except TypeError:
-            data = str(data)
-            return write(data)
         except FileNotFoundError:
             if parents:
                 self.parent.mkdir(parents=True)
@@ -331,37 +633,83 @@ class Pathier(pathlib.Path):
         except Exception as e:
             raise
 
-    def write_bytes(self, data: Buffer, parents: bool = True) -> int:
+    @instrumented("write_bytes", written=int)
+    def write_bytes(
+        self, data: Buffer, parents: bool = True, io_options: IOOptions | None = None
+    ) -> int:
         """Write bytes to file.
 
         #### :params:
 
         `parents`: If `True` and the write operation fails with a `FileNotFoundError`,
-        make the parent directory and retry the write."""
+        make the parent directory and retry the write.
+
+        `io_options`: Buffer size and page cache hints for the write.
+        e.g. `IOOptions(direct=True)` writes large files with `O_DIRECT` so they don't fill the page cache."""
+        write = (
+            functools.partial(iohints.write_file, self, options=io_options)
+            if io_options
+            else super().write_bytes
+        )
         try:
-            return super().write_bytes(data)
+            return write(data)
         except FileNotFoundError:
             if parents:
                 self.parent.mkdir(parents=True)
-                return super().write_bytes(data)
+                return write(data)
             else:
                 raise
         except Exception as e:
             raise
 
-    def append(self, data: str, new_line: bool = True, encoding: Any | None = None):
+    @instrumented("append")
+    def append(
+        self, data: str, new_line: bool = True, encoding: Any | None = None
+    ) -> int:
         """Append `data` to the file pointed to by this `Pathier` object.
 
         #### :params:
 
         `new_line`: If `True`, add `\\n` to `data`.
 
-        `encoding`: The file encoding to use."""
+        `encoding`: The file encoding to use.
+
+        :returns: The number of characters written.
+
+        This opens and closes the file on every call. For frequent appends, use `self.appender()`."""
         if new_line:
             data += "\n"
-        with self.open("a", encoding=encoding) as file:
-            file.write(data)
+        return self._write_str(data, "a", encoding)
+
+    def appender(
+        self,
+        buffer_size: int = 64 * 1024,
+        flush_interval: float | None = 1.0,
+        encoding: str | None = None,
+        new_line: bool = True,
+    ) -> Appender:
+        """Returns a thread safe `Appender` that buffers writes to this file and flushes them in batches.
+
+        The file is opened once with `O_APPEND` and every flush is a single write,
+        so several processes can append to the same file without interleaving partial lines.
+
+        #### :params:
+
+        `buffer_size`: Flush once this many bytes are buffered.
+
+        `flush_interval`: Also flush every this many seconds. If `None`, only flush on size or when closed.
 
+        `encoding`: The encoding to use for `str` data. Defaults to the locale encoding, same as `self.append()`.
+
+        `new_line`: If `True`, add `\\n` to each `str` written.
+
+        >>> with Pathier("events.log").appender() as log:
+        >>>     for event in events:
+        >>>         log.write(event)"""
+        self.parent.mkdir()
+        return Appender(self, buffer_size, flush_interval, encoding, new_line)
+
+    @instrumented("replace_strings")
     def replace_strings(
         self,
         substitutions: Sequence[tuple[str, str]],
@@ -413,10 +761,111 @@ class Pathier(pathlib.Path):
         `keepend`: If `True`, line breaks will be included in returned strings."""
         return self.read_text(encoding=encoding).splitlines(keepends)
 
+    def follow(
+        self,
+        offset: int | None = None,
+        inode: int | None = None,
+        encoding: str | None = None,
+        errors: str | None = None,
+        keepends: bool = False,
+        poll_interval: float = 0.5,
+        timeout: float | None = None,
+        use_inotify: bool = True,
+    ) -> Follower:
+        """Returns a `Follower` that yields lines as they're appended to this file, like `tail -F`.
+
+        Only the new data is read. Waits are woken by inotify on Linux and by polling elsewhere.
+        Rotation and truncation are detected by tracking the file's inode and size.
+        The returned object can be iterated with `for` or `async for`.
+
+        #### :params:
+
+        `offset`: The byte offset to start reading from. By default, start at the end of the file.
+
+        `inode`: The inode `offset` was saved for. If the file's inode has changed, start from the beginning instead.
+
+        `encoding`: The file encoding to use. Defaults to the locale encoding.
+
+        `keepends`: If `True`, line breaks will be included in yielded strings.
+
+        `poll_interval`: How often, in seconds, to check for new data when polling.
+
+        `timeout`: Stop iterating if no new lines arrive within this many seconds.
+        By default, iteration continues until `Follower.close()` is called.
+
+        `use_inotify`: If `False`, always poll.
+
+        >>> follower = Pathier("app.log").follow(offset=saved["offset"], inode=saved["inode"])
+        >>> for line in follower:
+        >>>     process(line)
+        >>>     saved = {"offset": follower.offset, "inode": follower.inode}"""
+        return Follower(
+            self,
+            offset,
+            inode,
+            encoding,
+            errors,
+            keepends,
+            poll_interval,
+            timeout,
+            use_inotify,
+        )
+
+    def chunks(
+        self, n: int | None = None, chunk_size: int | None = None
+    ) -> list[tuple[int, int]]:
+        """Split this file into `(start, end)` byte ranges that start and end on line boundaries.
+
+        Boundaries are found by seeking and reading to the next new line, so the whole file is never read.
+
+        #### :params:
+
+        `n`: The number of ranges to split the file into. Defaults to the number of CPUs.
+        There may be fewer if lines are longer than `size / n`.
+
+        `chunk_size`: Split the file into ranges of about this many bytes instead.
+
+        An empty file returns no ranges.
+
+        >>> Pathier("big.csv").chunks(4)
+        >>> [(0, 250013), (250013, 500021), (500021, 750002), (750002, 1000000)]"""
+        return chunking.line_aligned_ranges(self, n, chunk_size)
+
+    def map_chunks(
+        self,
+        func: Callable[[Any], T],
+        n: int | None = None,
+        chunk_size: int | None = None,
+        workers: int | None = None,
+        use_mmap: bool = False,
+    ) -> list[T]:
+        """Call `func` on the content of each of `self.chunks(n, chunk_size)` in a process pool.
+
+        Each worker process reads (or maps) only its own range, so file contents are never sent between processes.
+        `func` receives `bytes` and must be picklable, i.e. defined at the top level of a module.
+
+        Returns the results in file order.
+
+        #### :params:
+
+        `workers`: The number of processes to use. Defaults to the number of CPUs.
+
+        `use_mmap`: If `True`, memory map each range and pass `func` a `memoryview` of it instead of `bytes`.
+        The view is only valid until `func` returns.
+
+        >>> def count_lines(data: bytes) -> int:
+        >>>     return data.count(b"\\n")
+        >>> sum(Pathier("big.csv").map_chunks(count_lines))"""
+        return chunking.map_ranges(
+            self, func, self.chunks(n, chunk_size), workers, use_mmap
+        )
+
+    @instrumented("json_loads")
     def json_loads(self, encoding: Any | None = None, errors: Any | None = None) -> Any:
         """Load json file."""
         return json.loads(self.read_text(encoding, errors))
 
+    @instrumented("json_dumps")
     def json_dumps(
         self,
         data: Any,
@@ -437,18 +886,22 @@ class Pathier(pathlib.Path):
             parents,
         )
 
+    @instrumented("pickle_loads")
     def pickle_loads(self) -> Any:
         """Load pickle file."""
         return pickle.loads(self.read_bytes())
 
+    @instrumented("pickle_dumps")
     def pickle_dumps(self, data: Any):
         """Dump `data` to pickle file."""
         self.write_bytes(pickle.dumps(data))
 
+    @instrumented("toml_loads")
     def toml_loads(self, encoding: Any | None = None, errors: Any | None = None) -> Any:
         """Load toml file."""
         return tomlkit.loads(self.read_text(encoding, errors)).unwrap()
 
+    @instrumented("toml_dumps")
     def toml_dumps(
         self,
         data: Any,
@@ -464,14 +917,7 @@ class Pathier(pathlib.Path):
         `toml_encoders` can be a list of functions to call when a value in `data` doesn't map to `tomlkit`'s built in types.
         By default, anything that `tomlkit` can't convert will be cast to a string. Encoder order matters.
         e.g. By default any `Pathier` object in `data` will be converted to a string."""
-        encoders: list[Callable[[Any], Any]] = []
-        for toml_encoder in toml_encoders:
-            encoder: Callable[[Any], Any] = lambda x: tomlkit.item(  # type:ignore
-                toml_encoder(x)
-            )
-            encoders.append(encoder)
-            tomlkit.register_encoder(encoder)
-        try:
+        with _toml_encoders(toml_encoders):
             self.write_text(
                 tomlkit.dumps(data, sort_keys),  # type:ignore
                 encoding,
@@ -479,12 +925,8 @@ class Pathier(pathlib.Path):
                 newline,
                 parents,
             )
-        except Exception as e:
-            raise e
-        finally:
-            for encoder in encoders:
-                tomlkit.unregister_encoder(encoder)
 
+    @instrumented("loads")
     def loads(self, encoding: Any | None = None, errors: Any | None = None) -> Any:
         """Load a json, toml, or pickle file based off this path's suffix."""
         match self.suffix:
@@ -499,6 +941,7 @@ class Pathier(pathlib.Path):
                     f"No load function exists for file type `{self.suffix}`."
                 )
 
+    @instrumented("dumps")
     def dumps(
         self,
         data: Any,
@@ -510,13 +953,32 @@ class Pathier(pathlib.Path):
         default: Any | None = str,
         toml_encoders: Sequence[Callable[[Any], Any]] = [str],
         parents: bool = True,
+        atomic: bool = False,
     ):
         """Dump `data` to a json or toml file based off this instance's suffix.
 
         For toml files:
         `toml_encoders` can be a list of functions to call when a value in `data` doesn't map to `tomlkit`'s built in types.
         By default, anything that `tomlkit` can't convert will be cast to a string. Encoder order matters.
-        e.g. By default any `Pathier` object in `data` will be converted to a string."""
+        e.g. By default any `Pathier` object in `data` will be converted to a string.
+
+        If `atomic` is `True`, `data` is dumped to a temporary file in the same directory that then replaces this one,
+        so readers never see a partially written file."""
+        if atomic:
+            self._write_atomically(
+                lambda temp: temp.dumps(
+                    data,
+                    encoding,
+                    errors,
+                    newline,
+                    sort_keys,
+                    indent,
+                    default,
+                    toml_encoders,
+                    parents,
+                )
+            )
+            return
         match self.suffix:
             case ".json":
                 self.json_dumps(
@@ -533,17 +995,320 @@ class Pathier(pathlib.Path):
                     f"No dump function exists for file type `{self.suffix}`."
                 )
 
-    def delete(self, missing_ok: bool = True):
+    def _write_atomically(self, write: Callable[[Self], Any]):
+        """Call `write` with a temporary path in the same directory, then move that file over this one.
+
+        The temporary file gets this file's permissions, if it exists, and is synced to disk before the move
+        so a crash can't leave this path pointing at an empty or partial file."""
+        temp = self.with_name(f".{self.stem}.{uuid.uuid4().hex}{self.suffix}")
+        try:
+            write(temp)
+            if self.exists():
+                shutil.copymode(self, temp)
+            fd = os.open(temp, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            os.replace(temp, self)
+        except BaseException:
+            temp.unlink(True)
+            raise
+
+    def _serialize(
+        self,
+        data: Any,
+        sort_keys: bool = False,
+        indent: Any | None = None,
+        default: Any | None = str,
+    ) -> str | bytes:
+        """Returns `data` serialized for this path's suffix, the way `dumps()` would write it.
+
+        `toml` encoders must already be registered."""
+        match self.suffix:
+            case ".json":
+                return json.dumps(
+                    data, indent=indent, default=default, sort_keys=sort_keys
+                )
+            case ".toml":
+                return tomlkit.dumps(data, sort_keys)  # type:ignore
+            case ".pickle" | ".pkl":
+                return pickle.dumps(data)
+            case _:
+                raise ValueError(
+                    f"No dump function exists for file type `{self.suffix}`."
+                )
+
+    def _write_data(
+        self,
+        data: str | Buffer,
+        encoding: Any | None = None,
+        errors: Any | None = None,
+        newline: Any | None = None,
+        atomic: bool = False,
+    ):
+        """Write `data` as text if it's a `str` and as bytes otherwise, without creating parent directories."""
+        if isinstance(data, str):
+            write = lambda file: file.write_text(data, encoding, errors, newline, False)
+        else:
+            write = lambda file: file.write_bytes(data, False)
+        if atomic:
+            self._write_atomically(write)
+        else:
+            write(self)
+
+    @staticmethod
+    def write_many(
+        items: "Mapping[Pathish, str | Buffer]",
+        workers: int | None = None,
+        encoding: Any | None = None,
+        errors: Any | None = None,
+        newline: Any | None = None,
+        atomic: bool = False,
+    ) -> "dict[Pathier, Exception]":
+        """Write each value of `items` to its key path, concurrently.
+
+        `str` values are written as text and anything else as bytes.
+        Every missing parent directory is created once up front instead of per file.
+
+        Returns the paths that couldn't be written mapped to the exception raised,
+        so one bad file doesn't abort the rest of the batch. An empty `dict` means every write succeeded.
+
+        #### :params:
+
+        `workers`: The number of threads to write with. Defaults to the `ThreadPoolExecutor` default.
+
+        `atomic`: If `True`, each file is written to a temporary file that then replaces it,
+        so readers never see a partially written file.
+
+        >>> errors = Pathier.write_many({f"out/{i}.txt": str(i) for i in range(1000)})"""
+        paths = {Pathier(path): data for path, data in items.items()}
+        return batch.run_many(
+            list(paths),
+            lambda path: path._write_data(
+                paths[path], encoding, errors, newline, atomic
+            ),
+            workers,
+        )
+
+    @staticmethod
+    def dumps_many(
+        items: "Mapping[Pathish, Any]",
+        workers: int | None = None,
+        encoding: Any | None = None,
+        errors: Any | None = None,
+        newline: Any | None = None,
+        sort_keys: bool = False,
+        indent: Any | None = None,
+        default: Any | None = str,
+        toml_encoders: Sequence[Callable[[Any], Any]] = [str],
+        atomic: bool = False,
+    ) -> "dict[Pathier, Exception]":
+        """Dump each value of `items` to its key path, concurrently, picking the format by suffix like `dumps()`.
+
+        Serialization and writing both happen in the worker threads.
+        Every missing parent directory is created once up front instead of per file,
+        and `toml_encoders` are registered once for the whole batch.
+
+        Returns the paths that couldn't be dumped mapped to the exception raised,
+        e.g. a `ValueError` for an unsupported suffix or a `TypeError` for unserializable data.
+        An empty `dict` means every dump succeeded.
+
+        See `dumps()` and `write_many()` for the other parameters.
+
+        >>> records = {f"records/{record['id']}.json": record for record in load_records()}
+        >>> errors = Pathier.dumps_many(records, indent=2, atomic=True)
+        >>> for path, error in errors.items():
+        >>>     print(f"{path}: {error}")"""
+        paths = {Pathier(path): data for path, data in items.items()}
+
+        def dump(path: Pathier):
+            path._write_data(
+                path._serialize(paths[path], sort_keys, indent, default),
+                encoding,
+                errors,
+                newline,
+                atomic,
+            )
+
+        with _toml_encoders(toml_encoders):
+            return batch.run_many(list(paths), dump, workers)
+
+    def lock(self, shared: bool = False, timeout: float | None = None) -> FileLock:
+        """Returns a `FileLock` for this path to use as a context manager.
+
+        The lock is advisory and held on a hidden `.{name}.lock` file next to this one,
+        so it stays valid when this file is replaced, e.g. by `self.dumps(atomic=True)`.
+        Every process reading or writing this file needs to take the lock for it to have any effect.
+
+        #### :params:
+
+        `shared`: If `True`, take a shared (read) lock that other shared locks can hold at the same time.
+        Otherwise take an exclusive (write) lock.
+
+        `timeout`: Raise a `TimeoutError` if the lock can't be acquired within this many seconds.
+        By default, wait indefinitely.
+
+        >>> path = Pathier("state.json")
+        >>> with path.lock(shared=True):
+        >>>     state = path.loads()"""
+        return FileLock(self.with_name(f".{self.name}.lock"), shared, timeout)
+
+    def update(
+        self,
+        func: Callable[[Any], Any],
+        default: Any = None,
+        timeout: float | None = None,
+        encoding: Any | None = None,
+        errors: Any | None = None,
+    ) -> Any:
+        """Transactionally update the json, toml, or pickle file pointed to by this path.
+
+        Takes an exclusive `self.lock()`, loads the file, passes the content to `func`,
+        and atomically dumps the result before releasing the lock.
+        If `func` returns `None`, the content it was passed (presumably modified in place) is dumped.
+
+        Returns the dumped data.
+
+        #### :params:
+
+        `default`: The content to pass to `func` if this file doesn't exist.
+
+        `timeout`: Raise a `TimeoutError` if the lock can't be acquired within this many seconds.
+
+        >>> Pathier("counts.json").update(lambda counts: counts | {"runs": counts["runs"] + 1}, {"runs": 0})"""
+        with self.lock(timeout=timeout):
+            data = self.loads(encoding, errors) if self.exists() else default
+            result = func(data)
+            if result is None:
+                result = data
+            self.dumps(result, encoding, errors, atomic=True)
+        return result
+
+    def watch(
+        self,
+        recursive: bool = True,
+        debounce: float = 0.1,
+        poll_interval: float = 1.0,
+        timeout: float | None = None,
+        use_inotify: bool = True,
+    ) -> Watcher:
+        """Returns a `Watcher` that yields debounced `Change`s to this file or directory.
+
+        Uses inotify on Linux and falls back to polling `os.scandir` snapshots elsewhere.
+        The returned object can be iterated with `for` or `async for`.
+
+        #### :params:
+
+        `recursive`: If this path is a directory, also watch its subdirectories.
+
+        `debounce`: Changes are yielded once nothing has changed for this many seconds.
+
+        `poll_interval`: How often, in seconds, to check for changes when polling.
+
+        `timeout`: Stop iterating if no changes occur within this many seconds.
+        By default, iteration continues until `Watcher.close()` is called.
+
+        `use_inotify`: If `False`, always poll.
+
+        >>> for change in Pathier("configs").watch():
+        >>>     print(change.path, change.kind)
+        >>> "configs/app.toml modified" """
+        return Watcher(self, recursive, debounce, poll_interval, timeout, use_inotify)
+
+    def watch_loads(
+        self,
+        encoding: Any | None = None,
+        errors: Any | None = None,
+        debounce: float = 0.1,
+        poll_interval: float = 1.0,
+        timeout: float | None = None,
+    ) -> Iterator[Any]:
+        """Yield the result of `self.loads()` now and again every time this file changes.
+
+        The file is only re-parsed when its content actually changed,
+        so touching it or rewriting the same data doesn't trigger a reload.
+        Deletions are skipped until the file is recreated.
+
+        See `self.watch()` for parameter descriptions.
+
+        >>> for config in Pathier("config.toml").watch_loads():
+        >>>     apply(config)"""
+
+        def signature() -> tuple[int, int, int] | None:
+            try:
+                stat = self.stat()
+            except FileNotFoundError:
+                return None
+            return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+        def digest() -> bytes | None:
+            try:
+                return hashlib.blake2b(self.read_bytes()).digest()
+            except FileNotFoundError:
+                return None
+
+        # Start watching before the first load so a change in between isn't missed
+        with self.watch(False, debounce, poll_interval, timeout) as watcher:
+            loaded_signature, loaded_digest = signature(), digest()
+            if loaded_digest:
+                yield self.loads(encoding, errors)
+            for _ in watcher:
+                current = signature()
+                # Comparing stats first avoids reading the file for events that didn't touch it
+                if not current or current == loaded_signature:
+                    continue
+                loaded_signature = current
+                current_digest = digest()
+                if current_digest and current_digest != loaded_digest:
+                    loaded_digest = current_digest
+                    yield self.loads(encoding, errors)
+
+    @instrumented("unlink", syscall=True)
+    def unlink(self, missing_ok: bool = False):
+        """Remove this file or link.
+
+        If the path is a directory, use `self.delete()` instead."""
+        super().unlink(missing_ok)
+
+    @instrumented("delete")
+    def delete(
+        self,
+        missing_ok: bool = True,
+        include: Sequence[str] = (),
+        exclude: Sequence[str] = (),
+    ):
         """Delete the file or folder pointed to by this instance.
 
-        Uses `self.unlink()` if a file and uses `shutil.rmtree()` if a directory."""
+        Uses `self.unlink()` if a file and uses `shutil.rmtree()` if a directory.
+
+        #### :params:
+
+        `include`: If this is a directory and `include` or `exclude` are given, only delete the files under it
+        matching at least one of these patterns. Directories are left in place.
+
+        `exclude`: Don't delete files or descend into directories matching any of these patterns.
+
+        See `self.walk_entries()` for pattern matching details.
+
+        >>> Pathier("project").delete(include=["*.pyc"], exclude=[".venv"])"""
         if self.is_file():
             self.unlink(missing_ok)
         elif self.is_dir():
-            shutil.rmtree(self)
+            if include or exclude:
+                for file in list(self.walk_files(include, exclude)):
+                    file.unlink(True)
+            else:
+                shutil.rmtree(self)
 
+    @instrumented("copy")
     def copy(
-        self, new_path: Self | pathlib.Path | str, overwrite: bool = False
+        self,
+        new_path: Self | pathlib.Path | str,
+        overwrite: bool = False,
+        include: Sequence[str] = (),
+        exclude: Sequence[str] = (),
+        io_options: IOOptions | None = None,
     ) -> Self:
         """Copy the path pointed to by this instance
         to the instance pointed to by `new_path` using `shutil.copyfile`
@@ -556,23 +1321,158 @@ class Pathier(pathlib.Path):
         `new_path`: The copy destination.
 
         `overwrite`: If `True`, files already existing in `new_path` will be overwritten.
-        If `False`, only files that don't exist in `new_path` will be copied."""
+        If `False`, only files that don't exist in `new_path` will be copied.
+
+        `include`: When copying a directory, only copy files matching at least one of these patterns.
+
+        `exclude`: When copying a directory, don't copy files or descend into directories matching any of these patterns.
+
+        `io_options`: Buffer size and page cache hints for reading and writing file contents.
+        When given, files are copied through a buffer instead of with `shutil`'s zero copy fast paths.
+
+        See `self.walk_entries()` for pattern matching details.
+
+        >>> Pathier("project").copy("project_copy", exclude=[".git", "node_modules"])
+        >>> Pathier("dump.sql").copy("/mnt/backup/dump.sql", io_options=IOOptions(dontneed=True))"""
         dst = self.__class__(new_path)
+        copyfile = (
+            functools.partial(iohints.copy_file, options=io_options)
+            if io_options
+            else shutil.copyfile
+        )
         if self.is_dir():
-            if overwrite or not dst.exists():
+            if not include and not exclude and (overwrite or not dst.exists()):
                 dst.mkdir()
-                shutil.copytree(self, dst, dirs_exist_ok=True)
-            else:
-                files = self.rglob("*.*")
-                for file in files:
-                    dst = dst.with_name(file.name)
-                    if not dst.exists():
-                        shutil.copyfile(file, dst)
+                shutil.copytree(
+                    self,
+                    dst,
+                    dirs_exist_ok=True,
+                    # Keep `copytree`'s default of copying metadata along with the contents
+                    copy_function=(
+                        lambda src, dst: shutil.copystat(src, copyfile(src, dst))
+                    )
+                    if io_options
+                    else shutil.copy2,
+                )
+            elif overwrite or dst.is_dir() or not dst.exists():
+                # Collect first in case `dst` is inside this directory
+                for file in list(self.walk_files(include, exclude)):
+                    file_dst = dst / file.relative_to(self)
+                    if overwrite or not file_dst.exists():
+                        file_dst.parent.mkdir()
+                        copyfile(file, file_dst)
         elif self.is_file():
             if overwrite or not dst.exists():
-                shutil.copyfile(self, dst)
+                copyfile(self, dst)
         return dst
 
+    def sync_to(
+        self,
+        dst: Self | pathlib.Path | str,
+        checksum: bool = False,
+        delete: bool = False,
+        dry_run: bool = False,
+        include: Sequence[str] = (),
+        exclude: Sequence[str] = (),
+        workers: int | None = None,
+        io_options: IOOptions | None = None,
+    ) -> SyncReport:
+        """Make the directory `dst` a mirror of this directory, copying only new or changed files.
+
+        Files are considered unchanged if their sizes and modification times (to the second) match.
+        Copies are made in parallel with `shutil.copy2` so modification times are preserved for the next sync.
+        Directories missing from `dst`, including empty ones, are created.
+
+        Returns a `SyncReport` with the `created` directories, the `copied` and `deleted` paths, any `errors`,
+        and `bytes_transferred` vs `bytes_skipped`. `str()` of the report lists every action.
+
+        #### :params:
+
+        `checksum`: Compare file contents instead of modification times when sizes match.
+
+        `delete`: Delete files and directories in `dst` that aren't in this directory.
+        This includes a directory in `dst` where this directory has a file, as long as it only holds deletable files.
+        Without `delete`, such files are reported as errors and not copied.
+
+        `dry_run`: Don't change anything, just report what would be done.
+
+        `include`: Only sync files matching at least one of these patterns.
+
+        `exclude`: Don't sync files or directories matching any of these patterns.
+        Matching paths in `dst` are never deleted.
+
+        `workers`: The number of threads to scan, compare, and copy with.
+
+        `io_options`: Buffer size and page cache hints for copying and checksumming files.
+
+        See `self.walk_entries()` for pattern matching details.
+
+        >>> print(Pathier("project").sync_to("/mnt/backup/project", delete=True, dry_run=True))
+        >>> "copy project/main.py -> /mnt/backup/project/main.py"
+        >>> "Would transfer 1042 bytes in 1 files, skipped 531337 bytes in 97 unchanged files." """
+        return sync(
+            self, dst, checksum, delete, dry_run, include, exclude, workers, io_options
+        )
+
+    def pack(
+        self,
+        dst: Self | pathlib.Path | str,
+        include: Sequence[str] = (),
+        exclude: Sequence[str] = (),
+        level: int | None = None,
+        workers: int | None = None,
+        progress: Callable[[int, int], Any] | None = None,
+    ) -> ArchiveReport:
+        """Stream this file or directory into the archive `dst`.
+
+        The archive format is determined by the suffix of `dst`:
+        `.tar`, `.tar.gz`/`.tgz`, `.tar.xz`/`.txz`, `.tar.zst`/`.tzst`, or `.zip`.
+        Members are stored relative to this path's parent, i.e. the archive contains this directory, not just its contents.
+
+        gzip and xz tarballs are compressed in independent blocks on a thread pool and written as concatenated members/streams,
+        which any gzip or xz reader can decompress.
+        zstd tarballs use the `zstandard` package's multi-threaded compressor (install with `pip install pathier[zstd]`).
+        Zip members are compressed one at a time.
+
+        Returns an `ArchiveReport` with the number of `files`, uncompressed `bytes`, `archive_bytes`, `seconds`, and `throughput`.
+
+        #### :params:
+
+        `include`: Only archive files matching at least one of these patterns.
+
+        `exclude`: Don't archive files or directories matching any of these patterns.
+
+        `level`: The compression level. Defaults to `6` for gzip, xz, and zip and `3` for zstd.
+
+        `workers`: The number of compression threads. Defaults to the number of CPUs.
+
+        `progress`: A function to call with the number of bytes archived so far and the total number of bytes to archive.
+
+        See `self.walk_entries()` for pattern matching details.
+
+        >>> report = Pathier("results").pack("results.tar.gz", exclude=["*.tmp"])
+        >>> print(Pathier.format_bytes(report.throughput), "per second")"""
+        return archive.pack(self, dst, include, exclude, level, workers, progress=progress)
+
+    def unpack(
+        self,
+        dst: Self | pathlib.Path | str,
+        progress: Callable[[int, int], Any] | None = None,
+    ) -> ArchiveReport:
+        """Stream the archive pointed to by this path into the directory `dst`.
+
+        Supports the same formats as `self.pack()`.
+        Members that would be extracted outside of `dst` are rejected.
+
+        Returns an `ArchiveReport` with the number of `files`, uncompressed `bytes`, `archive_bytes`, `seconds`, and `throughput`.
+
+        #### :params:
+
+        `progress`: A function to call with the number of archive bytes read so far and the size of the archive.
+
+        >>> Pathier("inputs.tar.zst").unpack("data")"""
+        return archive.unpack(self, dst, progress)
+
     def backup(self, timestamp: bool = False) -> Self | None:
         """Create a copy of this file or directory with `_backup` appended to the path stem.
         If the path to be backed up doesn't exist, `None` is returned.
@@ -615,9 +1515,45 @@ class Pathier(pathlib.Path):
         then
         >>> path.execute("py", "--iterations 10")
         equivalent to
-        >>> os.system(f"py {path} --iterations 10")"""
+        >>> os.system(f"py {path} --iterations 10")
+
+        To run a command over many paths concurrently with output capture and timeouts, use `Pathier.execute_many()`."""
         return os.system(f"{command} {self} {args}")
 
+    @staticmethod
+    def execute_many(
+        paths: "Sequence[Pathish]",
+        command: str | Sequence[str],
+        workers: int | None = None,
+        timeout: float | None = None,
+        capture_output: bool = True,
+        cwd: "Pathish | None" = None,
+    ) -> list[ExecutionResult]:
+        """Run `command` on each of `paths` through `subprocess`, with at most `workers` running at once.
+
+        `command` is a template where `{path}`, `{name}`, `{stem}`, and `{parent}` are replaced for each path.
+        If it has no placeholders, the path is appended as the last argument.
+        String commands are split with `shlex.split` and no shell is involved, so paths never need quoting.
+
+        Returns an `ExecutionResult` per path, in the order of `paths`,
+        with the `args` run, `returncode`, `stdout`, `stderr`, `seconds` taken, and whether it `timed_out`.
+        `returncode` is `None` if the job timed out or couldn't be started (see `error`).
+
+        #### :params:
+
+        `workers`: The maximum number of concurrent jobs. Defaults to the number of CPUs.
+
+        `timeout`: Kill any job still running after this many seconds.
+
+        `capture_output`: If `False`, jobs inherit this process's stdout and stderr.
+
+        `cwd`: The working directory to run the jobs in.
+
+        >>> scripts = list(Pathier("scripts").walk_files(["*.py"]))
+        >>> results = Pathier.execute_many(scripts, "python {path} --iterations 10", timeout=60)
+        >>> failed = [result for result in results if not result.ok]"""
+        return execute_many(paths, command, workers, timeout, capture_output, cwd)
+
 
 Pathy = Pathier | pathlib.Path
 Pathish = Pathier | pathlib.Path | str
@@ -0,0 +1,139 @@
+import heapq
+import os
+from typing import Any
+
+from typing_extensions import Sequence
+
+from .instrumentation import count
+from .walker import WalkFilter
+
+
+class SizeReport:
+    """Totals, a per extension breakdown, and the largest files and directories found by a scan.
+
+    The largest files and directories are tracked with min-heaps of at most `top` items,
+    so memory use doesn't grow with the number of files scanned.
+
+    If `cumulative` is `True`, directory sizes include everything under them,
+    otherwise only the files directly in them."""
+
+    def __init__(self, top: int = 10, cumulative: bool = True):
+        self.top = top
+        self.cumulative = cumulative
+        self.total = 0
+        self.files = 0
+        self.extensions: dict[str, list[int]] = {}
+        self._files: list[tuple[int, str]] = []
+        self._dirs: list[tuple[int, str]] = []
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(total={self.total}, files={self.files})"
+
+    @staticmethod
+    def _push(heap: list[tuple[int, str]], item: tuple[int, str], top: int):
+        if len(heap) < top:
+            heapq.heappush(heap, item)
+        elif item > heap[0]:
+            heapq.heapreplace(heap, item)
+
+    def add_file(self, path: str, size: int):
+        self.total += size
+        self.files += 1
+        extension = os.path.splitext(path)[1].lower() or "(none)"
+        totals = self.extensions.setdefault(extension, [0, 0])
+        totals[0] += size
+        totals[1] += 1
+        self._push(self._files, (size, path), self.top)
+
+    def add_dir(self, path: str, size: int):
+        self._push(self._dirs, (size, path), self.top)
+
+    def merge(self, other: "SizeReport"):
+        """Add the results of `other` to this report."""
+        self.total += other.total
+        self.files += other.files
+        for extension, (size, count) in other.extensions.items():
+            totals = self.extensions.setdefault(extension, [0, 0])
+            totals[0] += size
+            totals[1] += count
+        for item in other._files:
+            self._push(self._files, item, self.top)
+        for item in other._dirs:
+            self._push(self._dirs, item, self.top)
+
+    @property
+    def largest_files(self) -> list[tuple[str, int]]:
+        """The `self.top` largest files as `(path, size)` pairs, largest first."""
+        return [(path, size) for size, path in sorted(self._files, reverse=True)]
+
+    @property
+    def largest_dirs(self) -> list[tuple[str, int]]:
+        """The `self.top` largest directories as `(path, size)` pairs, largest first.
+
+        If `self.cumulative` is `True`, a directory's size is the total of its whole subtree,
+        so a large tree of small directories still ranks, along with the ancestors containing it.
+        Otherwise it's only the files directly in the directory."""
+        return [(path, size) for size, path in sorted(self._dirs, reverse=True)]
+
+    @property
+    def by_extension(self) -> list[tuple[str, int, int]]:
+        """`(extension, size, count)` for every file extension found, largest total size first.
+
+        Files without an extension are grouped under `"(none)"`."""
+        return sorted(
+            (
+                (extension, size, count)
+                for extension, (size, count) in self.extensions.items()
+            ),
+            key=lambda item: item[1],
+            reverse=True,
+        )
+
+
+def size_report(
+    root: Any,
+    include: Sequence[str] = (),
+    exclude: Sequence[str] = (),
+    top: int = 10,
+    cumulative: bool = True,
+) -> SizeReport:
+    """Scan the directory `root` once and return a `SizeReport` of its contents.
+
+    The scan is depth first, so a directory's subtree total is complete once the scan leaves it.
+    Only the directories on the current path are kept open,
+    so memory use is bounded by the tree depth and `top` rather than the number of directories.
+
+    Unreadable subdirectories are skipped."""
+    walk_filter = WalkFilter(include, exclude)
+    report = SizeReport(top, cumulative)
+    # `[path, own size, subtree size]` of the directory being scanned and its ancestors
+    open_dirs: list[list[Any]] = []
+
+    def close_dir():
+        directory, own, subtree = open_dirs.pop()
+        report.add_dir(directory, subtree if cumulative else own)
+        if open_dirs:
+            open_dirs[-1][2] += subtree
+
+    stack = [(os.fspath(root), "", 0)]
+    while stack:
+        directory, relpath, depth = stack.pop()
+        # Everything deeper than or level with this directory has been fully scanned
+        while len(open_dirs) > depth:
+            close_dir()
+        entries, subdirs = walk_filter.scan(directory, relpath, not depth)
+        size = 0
+        # One `stat` per file
+        count(syscalls=len(entries))
+        for entry in entries:
+            try:
+                file_size = entry.stat().st_size
+            except OSError:
+                continue
+            size += file_size
+            report.add_file(entry.path, file_size)
+        open_dirs.append([directory, size, size])
+        stack.extend((path, relpath, depth + 1) for path, relpath in subdirs)
+    while open_dirs:
+        close_dir()
+    return report
@@ -0,0 +1,201 @@
+import concurrent.futures
+import os
+import shutil
+from typing import Any
+
+from typing_extensions import Sequence
+
+from .duplicates import hash_file
+from .iohints import IOOptions, copy_file
+from .walker import WalkFilter, walk
+
+
+class SyncReport:
+    """What a one-way sync created, copied, deleted, and skipped.
+
+    For a dry run, this is what the sync would do."""
+
+    def __init__(self, dry_run: bool):
+        self.dry_run = dry_run
+        self.created: list[Any] = []
+        self.copied: list[tuple[Any, Any]] = []
+        self.deleted: list[Any] = []
+        self.bytes_transferred = 0
+        self.bytes_skipped = 0
+        self.files_skipped = 0
+        self.errors: dict[Any, Exception] = {}
+
+    def __str__(self) -> str:
+        lines = [f"mkdir {path}" for path in self.created]
+        lines.extend(f"copy {src} -> {dst}" for src, dst in self.copied)
+        lines.extend(f"delete {path}" for path in self.deleted)
+        lines.extend(f"error {path}: {error}" for path, error in self.errors.items())
+        verb = "Would transfer" if self.dry_run else "Transferred"
+        lines.append(
+            f"{verb} {self.bytes_transferred} bytes in {len(self.copied)} files, "
+            f"skipped {self.bytes_skipped} bytes in {self.files_skipped} unchanged files."
+        )
+        return "\n".join(lines)
+
+
+def _snapshot(
+    root: str, walk_filter: WalkFilter, workers: int
+) -> tuple[dict[str, os.stat_result], set[str]]:
+    """Returns the stats of the files under `root` and the directories under `root`, keyed by relative path."""
+    files: dict[str, os.stat_result] = {}
+    dirs: set[str] = set()
+    if not os.path.isdir(root):
+        return files, dirs
+    for entry in walk(root, walk_filter, workers):
+        relpath = os.path.relpath(entry.path, root)
+        if entry.is_dir(follow_symlinks=walk_filter.follow_symlinks):
+            dirs.add(relpath)
+            continue
+        try:
+            files[relpath] = entry.stat()
+        except OSError:
+            continue
+    return files, dirs
+
+
+def _changed(src_stat: os.stat_result, dst_stat: os.stat_result | None) -> bool:
+    """Returns whether a file needs copying based on its source and destination stats."""
+    if dst_stat is None or src_stat.st_size != dst_stat.st_size:
+        return True
+    # Whole seconds, like rsync, since not every filesystem stores sub second mtimes
+    return int(src_stat.st_mtime) != int(dst_stat.st_mtime)
+
+
+def _copy(src: str, dst: str, io_options: IOOptions | None = None):
+    if os.path.isdir(dst):
+        # `copy2` would copy into the directory instead
+        raise IsADirectoryError(f"Can't copy file over directory {dst}")
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    # Preserve the mtime the next sync compares against
+    if io_options:
+        copy_file(src, dst, io_options)
+        shutil.copystat(src, dst)
+    else:
+        shutil.copy2(src, dst)
+
+
+def sync(
+    src: Any,
+    dst: Any,
+    checksum: bool = False,
+    delete: bool = False,
+    dry_run: bool = False,
+    include: Sequence[str] = (),
+    exclude: Sequence[str] = (),
+    workers: int | None = None,
+    io_options: IOOptions | None = None,
+) -> SyncReport:
+    """Make the directory `dst` mirror the directory `src`.
+
+    See `Pathier.sync_to()` for details."""
+    walk_filter = WalkFilter(include, exclude, types=("file", "dir"))
+    src, dst = os.fspath(src), os.fspath(dst)
+    report = SyncReport(dry_run)
+    with concurrent.futures.ThreadPoolExecutor(workers) as pool:
+        (src_files, src_dirs), (dst_files, dst_dirs) = pool.map(
+            lambda root: _snapshot(root, walk_filter, workers or 1), [src, dst]
+        )
+        to_copy: list[tuple[str, str, int]] = []
+        to_compare: list[tuple[str, str, int]] = []
+        for relpath, stat in src_files.items():
+            src_path, dst_path = os.path.join(src, relpath), os.path.join(dst, relpath)
+            if relpath in dst_dirs and not delete:
+                report.errors[src_path] = IsADirectoryError(
+                    f"Can't copy file over directory {dst_path}"
+                )
+            elif relpath in dst_dirs:
+                # The directory is an extra that's removed before copying
+                to_copy.append((src_path, dst_path, stat.st_size))
+            elif (
+                checksum
+                and relpath in dst_files
+                and dst_files[relpath].st_size == stat.st_size
+            ):
+                to_compare.append((src_path, dst_path, stat.st_size))
+            elif _changed(stat, dst_files.get(relpath)):
+                to_copy.append((src_path, dst_path, stat.st_size))
+            else:
+                report.files_skipped += 1
+                report.bytes_skipped += stat.st_size
+        hashes = pool.map(
+            lambda paths: hash_file(paths[0], io_options)
+            != hash_file(paths[1], io_options),
+            to_compare,
+        )
+        for (src_path, dst_path, size), changed in zip(to_compare, hashes):
+            if changed:
+                to_copy.append((src_path, dst_path, size))
+            else:
+                report.files_skipped += 1
+                report.bytes_skipped += size
+        # Parents first
+        missing_dirs = [
+            os.path.join(dst, relpath) for relpath in sorted(src_dirs - dst_dirs)
+        ]
+        extras: list[str] = []
+        extra_dirs: list[str] = []
+        if delete:
+            extras = [
+                os.path.join(dst, relpath)
+                for relpath in dst_files
+                if relpath not in src_files
+            ]
+            # Deepest first so children are removed before their parents
+            extra_dirs = sorted(
+                (os.path.join(dst, relpath) for relpath in dst_dirs - src_dirs),
+                key=len,
+                reverse=True,
+            )
+        if dry_run:
+            report.deleted.extend(extras + extra_dirs)
+            report.created.extend(missing_dirs)
+        else:
+            # Delete extras first in case a source file or directory replaced one of them
+            for path in extras:
+                try:
+                    os.unlink(path)
+                except OSError as e:
+                    report.errors[path] = e
+                else:
+                    report.deleted.append(path)
+            # Directories still holding excluded files are left alone
+            for path in extra_dirs:
+                try:
+                    os.rmdir(path)
+                except OSError:
+                    continue
+                report.deleted.append(path)
+            # Create directories up front so empty ones are mirrored too
+            for path in missing_dirs:
+                try:
+                    os.makedirs(path, exist_ok=True)
+                except OSError as e:
+                    report.errors[path] = e
+                else:
+                    report.created.append(path)
+            futures = {
+                pool.submit(_copy, src_path, dst_path, io_options): (
+                    src_path,
+                    dst_path,
+                    size,
+                )
+                for src_path, dst_path, size in to_copy
+            }
+            to_copy = []
+            for future in concurrent.futures.as_completed(futures):
+                src_path, dst_path, size = futures[future]
+                try:
+                    future.result()
+                except OSError as e:
+                    report.errors[src_path] = e
+                else:
+                    to_copy.append((src_path, dst_path, size))
+        for src_path, dst_path, size in to_copy:
+            report.copied.append((src_path, dst_path))
+            report.bytes_transferred += size
+    return report
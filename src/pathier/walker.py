@@ -0,0 +1,173 @@
+import concurrent.futures
+import fnmatch
+import os
+import time
+from typing import Any, Iterator
+
+from typing_extensions import Callable, Sequence
+
+from .instrumentation import carry, count
+
+
+class WalkFilter:
+    """Decides which directories a walk descends into and which entries it yields.
+
+    Patterns are `fnmatch` style and are matched against both an entry's name and its path relative to the walk root,
+    using forward slashes, e.g. `"node_modules"`, `"*.pyc"`, or `"build/*"`.
+
+    Excluded directories are pruned, i.e. never scanned.
+    `include` only affects which entries are yielded, not which directories are descended into.
+
+    #### :params:
+
+    `include`: If given, only yield entries matching at least one of these patterns.
+
+    `exclude`: Don't yield or descend into entries matching any of these patterns.
+
+    `min_size`: Only yield entries at least this many bytes.
+
+    `max_size`: Only yield entries at most this many bytes.
+
+    `newer_than`: Only yield entries modified less than this many seconds ago.
+
+    `older_than`: Only yield entries modified more than this many seconds ago.
+
+    `types`: The kinds of entries to yield, any of `"file"` and `"dir"`.
+
+    `predicate`: An additional function that takes an `os.DirEntry` and returns whether it should be yielded.
+
+    `follow_symlinks`: Whether to descend into symlinked directories."""
+
+    def __init__(
+        self,
+        include: Sequence[str] = (),
+        exclude: Sequence[str] = (),
+        min_size: int | None = None,
+        max_size: int | None = None,
+        newer_than: float | None = None,
+        older_than: float | None = None,
+        types: Sequence[str] = ("file",),
+        predicate: Callable[[os.DirEntry[str]], bool] | None = None,
+        follow_symlinks: bool = False,
+    ):
+        self.include = list(include)
+        self.exclude = list(exclude)
+        self.min_size = min_size
+        self.max_size = max_size
+        self.newer_than = newer_than
+        self.older_than = older_than
+        self.types = set(types)
+        self.predicate = predicate
+        self.follow_symlinks = follow_symlinks
+        self._needs_stat = any(
+            value is not None for value in (min_size, max_size, newer_than, older_than)
+        )
+
+    @staticmethod
+    def _matches_any(patterns: list[str], name: str, relpath: str) -> bool:
+        return any(
+            fnmatch.fnmatch(name, pattern) or fnmatch.fnmatch(relpath, pattern)
+            for pattern in patterns
+        )
+
+    def excludes(self, name: str, relpath: str) -> bool:
+        """Returns whether the entry at `relpath` is excluded."""
+        return bool(self.exclude) and self._matches_any(self.exclude, name, relpath)
+
+    def accepts(self, entry: os.DirEntry[str], kind: str, relpath: str) -> bool:
+        """Returns whether a non-excluded `entry` of type `kind` should be yielded."""
+        if kind not in self.types:
+            return False
+        if self.include and not self._matches_any(self.include, entry.name, relpath):
+            return False
+        if self._needs_stat:
+            count(syscalls=1)
+            try:
+                stat = entry.stat()
+            except OSError:
+                return False
+            if self.min_size is not None and stat.st_size < self.min_size:
+                return False
+            if self.max_size is not None and stat.st_size > self.max_size:
+                return False
+            age = time.time() - stat.st_mtime
+            if self.newer_than is not None and age > self.newer_than:
+                return False
+            if self.older_than is not None and age < self.older_than:
+                return False
+        return not self.predicate or self.predicate(entry)
+
+    def scan(
+        self, directory: str, relpath: str = "", is_root: bool = False
+    ) -> tuple[list[os.DirEntry[str]], list[tuple[str, str]]]:
+        """Scan a single directory.
+
+        Returns the accepted entries and the `(path, relpath)` of subdirectories to descend into.
+
+        Errors reading `directory` are ignored unless `is_root` is `True`.
+
+        Each scan is counted as a filesystem call by an active `instrument()` block."""
+        accepted: list[os.DirEntry[str]] = []
+        subdirs: list[tuple[str, str]] = []
+        count(syscalls=1)
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    entry_relpath = f"{relpath}{entry.name}"
+                    if self.excludes(entry.name, entry_relpath):
+                        continue
+                    try:
+                        if entry.is_dir(follow_symlinks=self.follow_symlinks):
+                            kind = "dir"
+                            subdirs.append((entry.path, f"{entry_relpath}/"))
+                        elif entry.is_file():
+                            kind = "file"
+                        else:
+                            continue
+                    except OSError:
+                        continue
+                    if self.accepts(entry, kind, entry_relpath):
+                        accepted.append(entry)
+        except OSError:
+            if is_root:
+                raise
+        return accepted, subdirs
+
+
+def walk(
+    root: Any, walk_filter: WalkFilter | None = None, workers: int = 1
+) -> Iterator[os.DirEntry[str]]:
+    """Yield `os.DirEntry` objects under `root` accepted by `walk_filter`.
+
+    Directories are yielded before their contents.
+    If `workers` is greater than `1`, directories are scanned concurrently on a thread pool
+    and the order entries are yielded in isn't deterministic."""
+    walk_filter = walk_filter or WalkFilter()
+    root = os.fspath(root)
+    if workers <= 1:
+        stack = [(root, "")]
+        is_root = True
+        while stack:
+            accepted, subdirs = walk_filter.scan(*stack.pop(), is_root=is_root)
+            is_root = False
+            yield from accepted
+            stack.extend(reversed(subdirs))
+        return
+    # Count the scans made on the pool towards whatever instrumented call is consuming this walk
+    scan = carry(walk_filter.scan)
+    pool = concurrent.futures.ThreadPoolExecutor(workers)
+    try:
+        pending = {pool.submit(scan, root, "", True)}
+        while pending:
+            done, pending = concurrent.futures.wait(
+                pending, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for future in done:
+                accepted, subdirs = future.result()
+                pending.update(
+                    pool.submit(scan, path, relpath)
+                    for path, relpath in subdirs
+                )
+                yield from accepted
+    finally:
+        pool.shutdown(cancel_futures=True)
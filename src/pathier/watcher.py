@@ -0,0 +1,354 @@
+import asyncio
+import ctypes
+import ctypes.util
+import errno
+import os
+import pathlib
+import select
+import struct
+import sys
+import time
+from typing import Any, AsyncIterator, Iterator, NamedTuple
+
+from typing_extensions import Self
+
+# inotify constants from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+_WATCH_MASK = (
+    IN_MODIFY
+    | IN_ATTRIB
+    | IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+    | IN_MOVE_SELF
+    | IN_ONLYDIR
+)
+_EVENT_HEADER = struct.Struct("iIII")
+
+# How long a blocking read waits before checking whether the watcher was closed.
+_WAKEUP_INTERVAL = 0.25
+
+
+class Change(NamedTuple):
+    """A single debounced change to a watched path.
+
+    `kind` is one of `"added"`, `"modified"`, or `"deleted"`."""
+
+    path: pathlib.Path
+    kind: str
+
+
+def _merge(previous: str | None, current: str) -> str | None:
+    """Coalesce two consecutive change kinds for the same path.
+
+    Returns `None` if the changes cancel out."""
+    if previous is None:
+        return current
+    if previous == "added":
+        return None if current == "deleted" else "added"
+    if previous == "deleted":
+        return "modified" if current == "added" else current
+    return current
+
+
+def _load_libc() -> Any | None:
+    """Returns libc if this platform supports inotify, otherwise `None`."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+class _InotifyBackend:
+    """Reads raw change events with Linux inotify."""
+
+    def __init__(self, libc: Any, root: str, recursive: bool):
+        self.libc = libc
+        self.recursive = recursive
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+        self.dirs: dict[int, str] = {}
+        try:
+            self.add_tree(root, True)
+        except OSError:
+            os.close(self.fd)
+            raise
+
+    def add_watch(self, directory: str):
+        wd = self.libc.inotify_add_watch(
+            self.fd, os.fsencode(directory), ctypes.c_uint32(_WATCH_MASK)
+        )
+        if wd < 0:
+            error = ctypes.get_errno()
+            if error == errno.ENOSPC:
+                raise OSError(
+                    error,
+                    "The inotify watch limit was reached, "
+                    "raise `fs.inotify.max_user_watches` or pass `use_inotify=False`",
+                    directory,
+                )
+            raise OSError(error, os.strerror(error), directory)
+        self.dirs[wd] = directory
+
+    def add_tree(self, directory: str, is_root: bool = False) -> list[str]:
+        """Watch `directory` (and its subdirectories if `self.recursive`).
+
+        Raises `OSError` if `directory` is the root and can't be watched,
+        or if any directory can't be watched because the inotify watch limit was reached.
+
+        Returns the files found in newly watched subdirectories."""
+        found: list[str] = []
+        try:
+            self.add_watch(directory)
+        except OSError as e:
+            # Subdirectories that were removed or can't be read are skipped, running out of watches isn't
+            if is_root or e.errno not in (errno.ENOENT, errno.ENOTDIR, errno.EACCES):
+                raise
+            return found
+        if not self.recursive:
+            return found
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            return found
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                found.append(entry.path)
+                found.extend(self.add_tree(entry.path))
+            else:
+                found.append(entry.path)
+        return found
+
+    def read(self, timeout: float) -> list[tuple[str, str]]:
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return []
+        events: list[tuple[str, str]] = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                # Events were dropped, the best we can do is say everything may have changed
+                events.extend((directory, "modified") for directory in self.dirs.values())
+                continue
+            if mask & IN_IGNORED:
+                self.dirs.pop(wd, None)
+                continue
+            directory = self.dirs.get(wd)
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, name)
+            if mask & (IN_CREATE | IN_MOVED_TO):
+                events.append((path, "added"))
+                if mask & IN_ISDIR and self.recursive:
+                    # Anything created before the watch was added would otherwise be missed
+                    events.extend((found, "added") for found in self.add_tree(path))
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                events.append((path, "deleted"))
+            elif mask & (IN_MODIFY | IN_CLOSE_WRITE | IN_ATTRIB):
+                events.append((path, "modified"))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class _PollingBackend:
+    """Detects changes by diffing `os.scandir` snapshots every `interval` seconds."""
+
+    def __init__(self, root: str, target: str | None, recursive: bool, interval: float):
+        self.root = root
+        self.target = target
+        self.recursive = recursive
+        self.interval = interval
+        self.snapshot = self.scan()
+        self.last_scan = time.monotonic()
+
+    def scan(self) -> dict[str, tuple[int, int, int]]:
+        snapshot: dict[str, tuple[int, int, int]] = {}
+        if self.target:
+            try:
+                stat = os.stat(self.target)
+                snapshot[self.target] = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+            except OSError:
+                pass
+            return snapshot
+        stack = [self.root]
+        while stack:
+            try:
+                entries = list(os.scandir(stack.pop()))
+            except OSError:
+                continue
+            for entry in entries:
+                try:
+                    stat = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                is_dir = entry.is_dir(follow_symlinks=False)
+                # Directory mtimes change whenever their contents do, so only track their existence
+                snapshot[entry.path] = (
+                    (0, 0, stat.st_ino)
+                    if is_dir
+                    else (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+                )
+                if is_dir and self.recursive:
+                    stack.append(entry.path)
+        return snapshot
+
+    def read(self, timeout: float) -> list[tuple[str, str]]:
+        wait = self.last_scan + self.interval - time.monotonic()
+        if wait > timeout:
+            time.sleep(timeout)
+            return []
+        if wait > 0:
+            time.sleep(wait)
+        snapshot = self.scan()
+        self.last_scan = time.monotonic()
+        events: list[tuple[str, str]] = []
+        for path, signature in snapshot.items():
+            previous = self.snapshot.get(path)
+            if previous is None:
+                events.append((path, "added"))
+            elif previous != signature:
+                events.append((path, "modified"))
+        events.extend(
+            (path, "deleted") for path in self.snapshot if path not in snapshot
+        )
+        self.snapshot = snapshot
+        return events
+
+    def close(self):
+        pass
+
+
+class Watcher:
+    """Yields debounced `Change`s to a file or directory tree.
+
+    Uses inotify on Linux and falls back to polling elsewhere,
+    or when inotify can't watch the path, e.g. because its directory doesn't exist yet.
+    If a directory created while iterating can't be watched because the inotify watch limit was reached,
+    iteration raises an `OSError` rather than silently missing changes in it.
+    Iterate over an instance with `for` or `async for`.
+    Changes are collected until nothing has changed for `debounce` seconds,
+    then yielded once per path with consecutive changes coalesced."""
+
+    def __init__(
+        self,
+        path: pathlib.Path,
+        recursive: bool = True,
+        debounce: float = 0.1,
+        poll_interval: float = 1.0,
+        timeout: float | None = None,
+        use_inotify: bool = True,
+    ):
+        self.path = path
+        self.debounce = debounce
+        self.timeout = timeout
+        self._closed = False
+        target = os.path.abspath(path)
+        if os.path.isdir(target):
+            root, self._target = target, None
+        else:
+            # Watch the parent so that files replaced by renaming, like most editors do, are still tracked
+            root, self._target = os.path.dirname(target), target
+        libc = _load_libc() if use_inotify else None
+        backend: _InotifyBackend | None = None
+        if libc:
+            try:
+                backend = _InotifyBackend(libc, root, recursive and not self._target)
+            except OSError:
+                # e.g. the watched file's directory doesn't exist yet or the watch limit was reached
+                pass
+        self._backend: _InotifyBackend | _PollingBackend = (
+            backend or _PollingBackend(root, self._target, recursive, poll_interval)
+        )
+
+    @property
+    def uses_inotify(self) -> bool:
+        """Whether this watcher is using inotify instead of polling."""
+        return isinstance(self._backend, _InotifyBackend)
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *args: Any):
+        self.close()
+
+    def close(self):
+        """Stop watching. Any iteration in progress will end."""
+        if not self._closed:
+            self._closed = True
+            self._backend.close()
+
+    def _read(self, timeout: float) -> list[tuple[str, str]]:
+        events = self._backend.read(min(timeout, _WAKEUP_INTERVAL))
+        if self._target:
+            events = [event for event in events if event[0] == self._target]
+        return events
+
+    def __iter__(self) -> Iterator[Change]:
+        pending: dict[str, str | None] = {}
+        last_event = last_yield = time.monotonic()
+        while not self._closed:
+            now = time.monotonic()
+            if pending:
+                wait = last_event + self.debounce - now
+            elif self.timeout is not None:
+                wait = last_yield + self.timeout - now
+                if wait <= 0:
+                    return
+            else:
+                wait = _WAKEUP_INTERVAL
+            events = self._read(max(wait, 0)) if wait > 0 else []
+            if self._closed:
+                return
+            if events:
+                for path, kind in events:
+                    pending[path] = _merge(pending.get(path), kind)
+                last_event = time.monotonic()
+            elif pending and time.monotonic() >= last_event + self.debounce:
+                changes = [
+                    Change(self.path.__class__(path), kind)
+                    for path, kind in pending.items()
+                    if kind
+                ]
+                pending.clear()
+                last_yield = time.monotonic()
+                yield from changes
+
+    async def __aiter__(self) -> AsyncIterator[Change]:
+        changes = iter(self)
+        done = object()
+        while True:
+            change = await asyncio.to_thread(next, changes, done)
+            if change is done:
+                return
+            yield change  # type: ignore
@@ -1,11 +1,18 @@
+import gzip
+import multiprocessing
 import os
+import shutil
 import sys
+import tarfile
+import threading
 import time
 from datetime import datetime
 from typing import Any
 
 import pytest
 
+from pathier import IOOptions, instrument
+from pathier.archive import pack
 from pathier.pathier import Pathier
 
 root = Pathier(__file__).parent
@@ -299,3 +306,562 @@ def test__read_tracking():
     assert file.last_read_time != last_read_time
     assert not file.modified_since_last_read
     file.delete()
+
+
+def test__instrument():
+    file = root / "instrumented" / "data.json"
+    exported = []
+    with instrument([root / "instrumented"], sink=exported.append) as stats:
+        file.dumps(dummy_obj)
+        file.loads()
+        file.size
+    ops = stats.by_op()
+    assert ops["dumps"].calls == 1
+    assert ops["loads"].calls == 1
+    assert ops["loads"].bytes_read == ops["read_text"].bytes_read > 0
+    assert ops["dumps"].bytes_written == ops["write_text"].bytes_written > 0
+    assert ops["loads"].syscalls >= 1
+    assert ops["size"].syscalls >= 1
+    assert ops["loads"].seconds >= ops["read_text"].seconds
+    assert list(stats.by_prefix()) == [str(root / "instrumented")]
+    assert exported == [stats]
+    # Nothing gets recorded once the block exits
+    file.loads()
+    assert stats.by_op()["loads"].calls == 1
+    with instrument() as stats:
+        file.json_loads()
+        file.follow(timeout=0).close()
+    assert stats.by_op()["json_loads"].calls == 1
+    assert stats.by_op()["json_loads"].bytes_read > 0
+    text = file.with_name("text.txt")
+    with instrument() as stats:
+        text.write_text("é" * 10, encoding="utf-8")
+        text.append("é", encoding="utf-8")
+        text.read_text(encoding="utf-8")
+        assert not file.with_name("missing").exists()
+    ops = stats.by_op()
+    # Bytes, not characters
+    assert ops["write_text"].bytes_written == 20
+    assert ops["append"].bytes_written == 3
+    assert ops["read_text"].bytes_read == 23
+    # Failed calls are still recorded
+    assert ops["stat"].calls == ops["stat"].syscalls == 1
+    file.parent.delete()
+    path = root / "walked"
+    make_tree(path)
+    for workers in [1, 2]:
+        with instrument() as stats:
+            path.get_size(workers=workers)
+        # 4 directory scans and 5 file stats, including those made on the thread pool
+        assert stats.by_op()["get_size"].syscalls - stats.by_op()["stat"].syscalls == 9
+    path.delete()
+
+
+def test__watch():
+    path = root / "watched"
+    path.mkdir()
+
+    def change():
+        time.sleep(0.2)
+        (path / "a.txt").write_text("a")
+        (path / "sub" / "b.txt").write_text("b")
+        (path / "a.txt").write_text("aa")
+
+    for use_inotify in [True, False]:
+        thread = threading.Thread(target=change)
+        thread.start()
+        with path.watch(
+            debounce=0.05, poll_interval=0.1, timeout=1, use_inotify=use_inotify
+        ) as watcher:
+            changes = {(change.path.name, change.kind) for change in watcher}
+        thread.join()
+        # Depending on timing, the second write to a.txt may land in a later batch
+        assert changes - {("a.txt", "modified")} == {
+            ("a.txt", "added"),
+            ("sub", "added"),
+            ("b.txt", "added"),
+        }
+        path.delete()
+        path.mkdir()
+    path.delete()
+    # inotify can't watch a directory that doesn't exist yet, so this falls back to polling
+    file = path / "later" / "c.txt"
+    with file.watch(debounce=0.05, poll_interval=0.1, timeout=1) as watcher:
+        assert not watcher.uses_inotify
+        file.write_text("c")
+        assert [(change.path, change.kind) for change in watcher] == [(file, "added")]
+    path.delete()
+
+
+def test__watch_loads():
+    path = root / "watched" / "config.json"
+    path.dumps({"n": 1})
+
+    def change():
+        time.sleep(0.3)
+        path.dumps({"n": 1})
+        time.sleep(0.3)
+        path.dumps({"n": 2})
+
+    thread = threading.Thread(target=change)
+    thread.start()
+    assert list(path.watch_loads(debounce=0.05, timeout=1)) == [{"n": 1}, {"n": 2}]
+    thread.join()
+    path.parent.delete()
+
+
+def make_tree(path: Pathier):
+    (path / "a.py").write_text("a" * 10)
+    (path / "b.txt").write_text("b" * 100)
+    (path / "sub" / "c.py").write_text("c" * 1000)
+    (path / "node_modules" / "d.py").write_text("d")
+    (path / "sub" / "node_modules" / "e.py").write_text("e")
+
+
+def test__walk_files():
+    path = root / "walked"
+    make_tree(path)
+    names = lambda files: sorted(file.name for file in files)
+    assert names(path.walk_files()) == ["a.py", "b.txt", "c.py", "d.py", "e.py"]
+    assert names(path.walk_files(exclude=["node_modules"])) == ["a.py", "b.txt", "c.py"]
+    assert names(path.walk_files(["*.py"], ["node_modules"])) == ["a.py", "c.py"]
+    assert names(path.walk_files(exclude=["sub/*"])) == ["a.py", "b.txt", "d.py"]
+    assert names(path.walk_files(min_size=50)) == ["b.txt", "c.py"]
+    assert names(path.walk_files(max_size=10, newer_than=60)) == ["a.py", "d.py", "e.py"]
+    assert names(path.walk_files(older_than=60)) == []
+    assert names(path.walk_files(types=["dir"])) == ["node_modules", "node_modules", "sub"]
+    assert names(path.walk_files(workers=4)) == names(path.walk_files())
+    assert path.get_size(exclude=["node_modules"]) == 1110
+    assert path.size == 1112
+    path.delete()
+
+
+def test__copy__filtered():
+    path = root / "walked"
+    make_tree(path)
+    dst = path.copy(root / "walked_copy", exclude=["node_modules"])
+    assert sorted(file.name for file in dst.walk_files()) == ["a.py", "b.txt", "c.py"]
+    (path / "a.py").write_text("changed")
+    path.copy(dst, include=["*.py"])
+    assert (dst / "a.py").read_text() == "a" * 10
+    path.copy(dst, True, include=["*.py"])
+    assert (dst / "a.py").read_text() == "changed"
+    dst.delete(include=["*.py"])
+    assert sorted(file.name for file in dst.walk_files()) == ["b.txt"]
+    assert (dst / "sub").is_dir()
+    path.delete()
+    dst.delete()
+
+
+def test__find_duplicates():
+    path = root / "duplicates"
+    data = os.urandom(20000)
+    for name in ["a.bin", "sub/b.bin", "skip/c.bin"]:
+        (path / name).write_bytes(data)
+    # Same size and same ends, different middle
+    (path / "d.bin").write_bytes(data[:10000] + bytes(1) + data[10001:])
+    (path / "e.txt").write_text("small")
+    (path / "sub" / "f.txt").write_text("small")
+    groups = path.find_duplicates(exclude=["skip"])
+    assert [sorted(file.name for file in group.paths) for group in groups] == [
+        ["a.bin", "b.bin"],
+        ["e.txt", "f.txt"],
+    ]
+    assert groups[0].reclaimable == 20000
+    assert path.find_duplicates(min_size=10, hardlink=True)[0].reclaimable == 40000
+    assert (path / "a.bin").stat().st_ino == (path / "skip" / "c.bin").stat().st_ino
+    # Hard links to the same file aren't duplicates
+    assert len(path.find_duplicates(min_size=10)) == 0
+    path.delete()
+
+
+def test__sync_to(monkeypatch: pytest.MonkeyPatch):
+    path = root / "walked"
+    make_tree(path)
+    dst = root / "synced"
+    (dst / "extra" / "x.txt").write_text("x")
+    (dst / "node_modules" / "keep.txt").write_text("k")
+    plan = path.sync_to(dst, delete=True, dry_run=True, exclude=["node_modules"])
+    assert len(plan.copied) == 3
+    assert plan.bytes_transferred == 1110
+    assert not (dst / "a.py").exists()
+    report = path.sync_to(dst, delete=True, exclude=["node_modules"])
+    assert report.bytes_transferred == 1110
+    assert sorted(str(file.relative_to(dst)) for file in dst.walk_files()) == [
+        "a.py",
+        "b.txt",
+        "node_modules/keep.txt",
+        "sub/c.py",
+    ]
+    assert not (dst / "extra").exists()
+    (path / "a.py").write_text("a" * 11)
+    report = path.sync_to(dst, exclude=["node_modules"])
+    assert [dst_path for _, dst_path in report.copied] == [str(dst / "a.py")]
+    assert report.bytes_transferred == 11
+    assert report.bytes_skipped == 1100
+    assert report.files_skipped == 2
+    # Same size and mtime, different content
+    (dst / "b.txt").write_text("c" * 100)
+    mtime_ns = (path / "b.txt").stat().st_mtime_ns
+    os.utime(dst / "b.txt", ns=(mtime_ns, mtime_ns))
+    assert not path.sync_to(dst, exclude=["node_modules"]).copied
+    report = path.sync_to(dst, checksum=True, exclude=["node_modules"])
+    assert report.bytes_transferred == 100
+    assert (dst / "b.txt").read_text() == "b" * 100
+    # Only files that exist in both trees with the same size get hashed
+    hashed = []
+
+    def hash_file(path: str, io_options: IOOptions | None = None) -> str:
+        hashed.append(path)
+        return "hash"
+
+    monkeypatch.setattr("pathier.sync.hash_file", hash_file)
+    (path / "new.txt").write_text("new")
+    report = path.sync_to(dst, checksum=True, exclude=["node_modules"])
+    assert [dst_path for _, dst_path in report.copied] == [str(dst / "new.txt")]
+    assert str(path / "new.txt") not in hashed
+    monkeypatch.undo()
+    # Empty directories are mirrored and, with `delete`, a directory where the source has a file is replaced
+    (path / "empty").mkdir()
+    (path / "d").write_text("d")
+    (dst / "d" / "nested" / "x.txt").write_text("x")
+    report = path.sync_to(dst, exclude=["node_modules"])
+    assert report.created == [str(dst / "empty")]
+    assert list(report.errors) == [str(path / "d")]
+    report = path.sync_to(dst, delete=True, exclude=["node_modules"])
+    assert not report.errors
+    assert (dst / "empty").is_dir()
+    assert (dst / "d").read_text() == "d"
+    path.delete()
+    dst.delete()
+
+
+def test__pack__unpack():
+    path = root / "walked"
+    make_tree(path)
+    (path / "big.bin").write_bytes(os.urandom(50000) * 20)
+    (path / "empty").mkdir()
+    expected = sorted(
+        str(file.relative_to(path)) for file in path.walk_files(exclude=["node_modules"])
+    )
+    for suffix in [".tar", ".tar.gz", ".tar.xz", ".zip"]:
+        archive = root / "archives" / f"walked{suffix}"
+        updates: list[tuple[int, int]] = []
+        report = path.pack(
+            archive,
+            exclude=["node_modules"],
+            workers=4,
+            progress=lambda done, total: updates.append((done, total)),
+        )
+        assert report.files == len(expected)
+        assert report.bytes == 1_001_110
+        assert updates[-1] == (1_001_110, 1_001_110)
+        report = archive.unpack(root / "archives" / "unpacked")
+        assert report.files == len(expected)
+        unpacked = root / "archives" / "unpacked" / "walked"
+        assert sorted(str(file.relative_to(unpacked)) for file in unpacked.walk_files()) == expected
+        assert (unpacked / "big.bin").read_bytes() == (path / "big.bin").read_bytes()
+        assert (unpacked / "empty").is_dir()
+        (root / "archives" / "unpacked").delete()
+    # Compressed blocks are independent gzip members any reader can decompress
+    blocks = root / "archives" / "blocks.tgz"
+    pack(path, blocks, workers=4, block_size=64 * 1024)
+    with tarfile.open(blocks) as archive:
+        assert archive.getmember("walked/big.bin").size == 1_000_000
+    with gzip.open(blocks) as file:
+        assert len(file.read()) > 1_000_000
+    # Zip members honor `level`
+    (path / "words.txt").write_text(" ".join(str(n) for n in range(20000)))
+    sizes = []
+    for level in [0, 1, 9]:
+        archive = root / "archives" / f"level{level}.zip"
+        path.pack(archive, exclude=["big.bin"], level=level)
+        sizes.append(archive.stat().st_size)
+    # Stored is largest, but level 1 can beat level 9 on some inputs
+    assert sizes[0] > max(sizes[1:])
+    assert len(set(sizes)) == 3
+    with pytest.raises(ValueError):
+        path.pack(root / "archives" / "walked.rar")
+
+    # A failed pack doesn't leave a partial archive behind
+    def fail(done: int, total: int):
+        raise RuntimeError("cancelled")
+
+    for suffix in [".tar.gz", ".zip"]:
+        archive = root / "archives" / f"failed{suffix}"
+        with pytest.raises(RuntimeError):
+            path.pack(archive, progress=fail)
+        assert not archive.exists()
+    # An archive written inside the directory being packed isn't added to itself
+    archive = path / "self.tar"
+    path.pack(archive, exclude=["node_modules"])
+    with tarfile.open(archive) as tar:
+        assert "walked/self.tar" not in tar.getnames()
+    path.delete()
+    (root / "archives").delete()
+
+
+def test__pack__unpack__zstd():
+    pytest.importorskip("zstandard")
+    path = root / "zstd"
+    make_tree(path)
+    archive = root / "zstd_archives" / "zstd.tar.zst"
+    report = path.pack(archive, level=10, workers=2)
+    assert report.files == len(list(path.walk_files()))
+    archive.unpack(root / "zstd_archives" / "unpacked")
+    unpacked = root / "zstd_archives" / "unpacked" / "zstd"
+    for file in path.walk_files():
+        assert (unpacked / file.relative_to(path)).read_bytes() == file.read_bytes()
+    path.delete()
+    (root / "zstd_archives").delete()
+
+
+def test__appender():
+    path = root / "appended" / "log.txt"
+    with path.appender(buffer_size=100, flush_interval=None) as appender:
+        appender.write("1")
+        assert not path.read_text()
+        appender.flush()
+        assert path.split() == ["1"]
+
+        def write(n: int):
+            for i in range(200):
+                appender.write(f"{n}-{i}")
+
+        threads = [threading.Thread(target=write, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # Size triggered flushes only write complete lines
+        assert path.read_text().endswith("\n")
+    lines = path.split()
+    assert len(lines) == 801
+    assert {f"{n}-{i}" for n in range(4) for i in range(200)} <= set(lines)
+    assert appender.bytes_written == path.size
+    with pytest.raises(ValueError):
+        appender.write("closed")
+    with path.appender(flush_interval=0.1) as appender:
+        appender.write("2")
+        time.sleep(0.3)
+        assert path.split()[-1] == "2"
+    path.parent.delete()
+
+
+def increment(path: Pathier, times: int):
+    for _ in range(times):
+        path.update(lambda state: state.update(n=state["n"] + 1), {"n": 0})
+
+
+def test__update():
+    path = root / "locked" / "state.json"
+    processes = [
+        multiprocessing.Process(target=increment, args=(path, 25)) for _ in range(4)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    assert path.loads() == {"n": 100}
+    assert sorted(file.name for file in path.parent.walk_files()) == [
+        ".state.json.lock",
+        "state.json",
+    ]
+    # The replaced file keeps its permissions
+    path.chmod(0o600)
+    increment(path, 1)
+    assert path.loads() == {"n": 101}
+    assert path.stat().st_mode & 0o777 == 0o600
+    path.parent.delete()
+
+
+def test__lock():
+    path = root / "locked" / "state.json"
+    with path.lock(shared=True), path.lock(shared=True, timeout=0.1):
+        with pytest.raises(TimeoutError):
+            path.lock(timeout=0.1).acquire()
+    with path.lock():
+        with pytest.raises(TimeoutError):
+            path.lock(shared=True, timeout=0.1).acquire()
+    with path.lock(timeout=0.1) as lock:
+        assert lock.locked
+    assert not lock.locked
+    path.parent.delete()
+
+
+def test__follow():
+    path = root / "followed" / "app.log"
+    path.join(["old 1", "old 2", ""])
+
+    def write():
+        time.sleep(0.2)
+        path.append("new 1")
+        with path.open("a") as file:
+            file.write("new ")
+        time.sleep(0.2)
+        path.append("2")
+        time.sleep(0.2)
+        # Rotate
+        path.rename(path.with_name("app.log.1"))
+        path.append("rotated 1")
+        time.sleep(0.2)
+        # Truncate
+        path.write_text("t 1\n")
+
+    for use_inotify in [True, False]:
+        thread = threading.Thread(target=write)
+        thread.start()
+        follower = path.follow(poll_interval=0.05, timeout=1, use_inotify=use_inotify)
+        assert list(follower) == ["new 1", "new 2", "rotated 1", "t 1"]
+        thread.join()
+        assert follower.offset == path.size
+        assert follower.inode == path.stat().st_ino
+        path.parent.delete()
+        path.join(["old 1", "old 2", ""])
+    # Resume from a saved position
+    follower = path.follow(0, path.stat().st_ino, timeout=0.1)
+    assert list(follower) == ["old 1", "old 2"]
+    path.append("old 3")
+    assert list(path.follow(follower.offset, follower.inode, timeout=0.1)) == ["old 3"]
+    assert list(path.follow(follower.offset, -1, timeout=0.1))[0] == "old 1"
+    path.parent.delete()
+    # A file whose directory doesn't exist yet is polled for until it appears
+    later = root / "followed" / "later" / "app.log"
+    follower = later.follow(poll_interval=0.05, timeout=0.5)
+
+    def create():
+        time.sleep(0.2)
+        later.parent.mkdir(parents=True)
+        later.append("first")
+
+    thread = threading.Thread(target=create)
+    thread.start()
+    assert list(follower) == ["first"]
+    thread.join()
+    path.parent.delete()
+
+
+def count_lines(data: bytes) -> int:
+    return bytes(data).count(b"\n")
+
+
+def test__chunks():
+    path = root / "chunked.txt"
+    lines = [str(n) * (n % 7 + 1) for n in range(1000)]
+    path.join(lines + [""])
+    data = path.read_bytes()
+    for kwargs in [{"n": 1}, {"n": 7}, {"chunk_size": 100}, {"chunk_size": 1}]:
+        ranges = path.chunks(**kwargs)
+        assert ranges[0][0] == 0 and ranges[-1][1] == len(data)
+        for (_, end), (start, _) in zip(ranges, ranges[1:]):
+            assert end == start
+            assert data[start - 1 : start] == b"\n"
+    assert len(path.chunks(7)) == 7
+    assert len(path.chunks(chunk_size=1)) == 1000
+    for kwargs in [{"n": 2, "chunk_size": 100}, {"n": 0}, {"chunk_size": 0}]:
+        with pytest.raises(ValueError):
+            path.chunks(**kwargs)
+    assert sum(path.map_chunks(count_lines, 5, workers=2)) == 1000
+    assert sum(path.map_chunks(count_lines, 5, workers=2, use_mmap=True)) == 1000
+    path.write_text("")
+    assert path.chunks(4) == []
+    assert path.map_chunks(count_lines) == []
+    path.delete()
+
+
+def test__execute_many():
+    path = root / "executed"
+    scripts = []
+    for n in range(4):
+        script = path / f"script{n}.py"
+        script.write_text(
+            f"import sys, time\ntime.sleep({n} * 0.5)\nprint(sys.argv[1:])\nsys.exit({n % 2})"
+        )
+        scripts.append(script)
+    start = time.time()
+    results = Pathier.execute_many(
+        scripts, [sys.executable, "{path}", "{stem}", "x y"], 4, timeout=1.25
+    )
+    # Concurrent, so bounded by the slowest job rather than the sum
+    assert time.time() - start < 2.5
+    assert [result.returncode for result in results] == [0, 1, 0, None]
+    assert results[0].stdout.strip() == "['script0', 'x y']"
+    assert results[3].timed_out
+    assert results[2].seconds >= 1
+    assert not results[1].ok
+    result = Pathier.execute_many([scripts[0]], f"{sys.executable}")[0]
+    assert result.args == [sys.executable, str(scripts[0])]
+    assert Pathier.execute_many([scripts[0]], "not-a-real-command")[0].error
+    path.delete()
+
+
+def test__size_report():
+    path = root / "walked"
+    make_tree(path)
+    (path / "sub" / "notes").write_text("n" * 5)
+    report = path.size_report(exclude=["node_modules"], top=2)
+    assert report.total == 1115
+    assert report.files == 4
+    assert report.by_extension == [(".py", 1010, 2), (".txt", 100, 1), ("(none)", 5, 1)]
+    assert report.largest_files == [
+        (str(path / "sub" / "c.py"), 1000),
+        (str(path / "b.txt"), 100),
+    ]
+    assert report.largest_dirs == [(str(path), 1115), (str(path / "sub"), 1005)]
+    own = path.size_report(exclude=["node_modules"], top=2, cumulative=False)
+    assert own.largest_dirs == [(str(path / "sub"), 1005), (str(path), 110)]
+    other = (path / "node_modules").size_report()
+    report.merge(other)
+    assert report.total == 1116
+    assert len(report.largest_files) == 2
+    # A tree of many small directories outranks a directory with one larger file
+    for n in range(20):
+        (path / "cache" / str(n) / "x").write_bytes(b"x" * 60)
+    assert path.size_report(top=3).largest_dirs[1] == (str(path / "cache"), 1200)
+    path.delete()
+
+
+def test__dumps_many():
+    path = root / "batch"
+    items = {path / f"{n % 3}" / f"{n}.json": {"n": n, "path": path} for n in range(30)}
+    items[path / "config.toml"] = {"path": path}
+    items[path / "data.pkl"] = lambda: None
+    items[path / "data.csv"] = [1, 2]
+    errors = Pathier.dumps_many(items, indent=2, atomic=True)
+    assert sorted(file.name for file in errors) == ["data.csv", "data.pkl"]
+    assert isinstance(errors[path / "data.csv"], ValueError)
+    assert (path / "2" / "5.json").loads() == {"n": 5, "path": str(path)}
+    assert (path / "config.toml").loads() == {"path": str(path)}
+    assert len(list(path.walk_files())) == 31
+    errors = Pathier.write_many(
+        {path / "a.txt": "a", path / "b.bin": b"b", path / "0" / "0.json" / "c": "c"}
+    )
+    assert list(errors) == [path / "0" / "0.json" / "c"]
+    assert (path / "a.txt").read_text() == "a"
+    assert (path / "b.bin").read_bytes() == b"b"
+    path.delete()
+
+
+def test__io_options():
+    path = root / "hinted"
+    data = os.urandom(3 * 4096 + 5)
+    for io_options in [
+        IOOptions(buffer_size=5000, direct=True),
+        IOOptions(buffer_size=1000, sequential=True, willneed=True, dontneed=True),
+    ]:
+        assert (path / "data.bin").write_bytes(data, io_options=io_options) == len(data)
+        assert (path / "data.bin").read_bytes(io_options=io_options) == data
+        dst = path.copy(root / "hinted_copy", True, io_options=io_options)
+        assert (dst / "data.bin").read_bytes() == data
+        assert path.find_duplicates(io_options=io_options) == []
+        with (dst / "data.bin").open("rb", io_options=io_options) as file:
+            assert file.read() == data
+        dst.delete()
+    # Copying a file onto itself raises instead of truncating it
+    with pytest.raises(shutil.SameFileError):
+        (path / "data.bin").copy(path / "data.bin", True, io_options=IOOptions())
+    assert (path / "data.bin").read_bytes() == data
+    assert IOOptions(buffer_size=5000, direct=True).chunk_size == 8192
+    with pytest.raises(ValueError):
+        IOOptions(buffer_size=0)
+    path.delete()